@@ -2,24 +2,34 @@
 Endpoints de Machine Learning para previsões, recomendações e segmentação
 """
 
+import hashlib
 from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 
-from app.db import get_db
+from app.db import get_db, pool_stats
 from app.models import TourismStatistics, Destination, User
 from app.services.forecast import get_forecast_service
-from app.services.clustering import get_clustering_service
-from app.services.recommender import get_recommender_service
+from app.services.clustering import FEATURE_ORDER as SEGMENT_FEATURES, get_clustering_service
+from app.services.executor import get_inference_executor
+from app.services.historical import get_historical_averages
+from app.services.jobs import JOB_TYPES, get_job_runner
+from app.services.registry import get_model_registry
+from app.services.warmup import get_warmup_state
+from app.services.write_behind import get_impression_writer, get_prediction_writer
 
 
 router = APIRouter(prefix="/ml", tags=["Machine Learning"])
 
+# Probes de liveness/readiness: montadas sem a dependência de API Key (ver routes.py)
+probes_router = APIRouter(prefix="/ml", tags=["Machine Learning"])
+
 
 # ============================================================================
 # Schemas (Pydantic Models)
@@ -49,6 +59,23 @@ class ForecastResponse(BaseModel):
     generated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class BatchForecastRequest(BaseModel):
+    """Request para várias previsões num único pedido"""
+    items: List[ForecastRequest] = Field(
+        ...,
+        min_items=1,
+        max_items=500,
+        description="Lista de província/mês/ano a prever"
+    )
+
+
+class BatchForecastResponse(BaseModel):
+    """Response com previsões na mesma ordem do pedido"""
+    forecasts: List[ForecastResponse]
+    total: int
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class UserPreferences(BaseModel):
     """Preferências do usuário para recomendações"""
     categories: Optional[List[str]] = Field(
@@ -102,6 +129,41 @@ class TouristSegment(BaseModel):
     characteristics: List[str]
 
 
+class UserSegmentFeatures(BaseModel):
+    """Perfil de viagem de um usuário para segmentação"""
+    user_id: Optional[str] = Field(default=None, description="ID do usuário (opcional)")
+    budget: int = Field(default=2, ge=1, le=3, description="Orçamento: 1 (low), 2 (medium), 3 (high)")
+    trip_duration: float = Field(default=7.0, gt=0, description="Dias por viagem")
+    beach_pref: float = Field(default=0.5, ge=0.0, le=1.0)
+    culture_pref: float = Field(default=0.5, ge=0.0, le=1.0)
+    nature_pref: float = Field(default=0.5, ge=0.0, le=1.0)
+    adventure_pref: float = Field(default=0.5, ge=0.0, le=1.0)
+    gastronomy_pref: float = Field(default=0.5, ge=0.0, le=1.0)
+    trips_per_year: int = Field(default=2, ge=0, description="Viagens por ano")
+    group_size: int = Field(default=2, ge=1, description="Tamanho típico do grupo")
+
+
+class SegmentPredictRequest(BaseModel):
+    """Request para segmentar vários usuários num único pedido"""
+    users: List[UserSegmentFeatures] = Field(..., min_items=1, max_items=10000)
+
+
+class UserSegmentPrediction(BaseModel):
+    """Segmento previsto para um usuário"""
+    user_id: Optional[str]
+    segment_id: Optional[str]
+    segment_name: Optional[str]
+    confidence: float = Field(..., ge=0.0, le=1.0)
+
+
+class SegmentPredictResponse(BaseModel):
+    """Response com segmentos na mesma ordem do pedido"""
+    predictions: List[UserSegmentPrediction]
+    total: int
+    model_version: str = "v1.0.0-kmeans-trained"
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class SegmentsResponse(BaseModel):
     """Response com perfis de turistas"""
     segments: List[TouristSegment]
@@ -114,6 +176,141 @@ class SegmentsResponse(BaseModel):
 # Endpoints
 # ============================================================================
 
+VALID_PROVINCES = ["Luanda", "Benguela", "Huila", "Namibe", "Cunene", "Malanje"]
+
+# Visitantes base por província quando não há dados históricos
+PROVINCE_BASE_VISITORS = {
+    "Luanda": 12000,
+    "Benguela": 4500,
+    "Huila": 3000,
+    "Namibe": 1500,
+    "Cunene": 800,
+    "Malanje": 2000,
+}
+
+# Multiplicadores de sazonalidade por mês
+SEASONAL_MULTIPLIERS = {
+    1: 1.3, 2: 0.9, 3: 0.8, 4: 0.9, 5: 0.95, 6: 1.0,
+    7: 1.25, 8: 1.2, 9: 0.9, 10: 0.85, 11: 0.95, 12: 1.4
+}
+
+
+def _validate_province(province: str):
+    if province not in VALID_PROVINCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Província inválida. Use uma de: {', '.join(VALID_PROVINCES)}"
+        )
+
+
+async def _historical_averages(db: AsyncSession, province: str, months: List[int]) -> dict:
+    """Média histórica de visitantes por mês para uma província (memória; query se a tabela não carregou)."""
+    table = get_historical_averages()
+    if table.loaded:
+        averages = {}
+        for month in months:
+            value = table.get(province, month)
+            if value is not None:
+                averages[month] = value
+        return averages
+
+    averages = {}
+    try:
+        query = select(
+            TourismStatistics.month,
+            func.avg(
+                TourismStatistics.domestic_visitors + TourismStatistics.foreign_visitors
+            ).label("avg_visitors")
+        ).where(
+            and_(
+                TourismStatistics.province == province,
+                TourismStatistics.month.in_(months)
+            )
+        ).group_by(TourismStatistics.month)
+        
+        result = await db.execute(query)
+        for row in result:
+            if row.avg_visitors is not None:
+                averages[row.month] = int(row.avg_visitors)
+    except Exception as db_err:
+        print(f"DB query error for forecast fallback ({province}): {db_err}")
+    
+    return averages
+
+
+def _baseline_forecast(province: str, month: int, year: int, avg_historical: Optional[int]) -> ForecastResponse:
+    """Previsão de fallback: média histórica + tendência + sazonalidade."""
+    if avg_historical is None:
+        avg_historical = PROVINCE_BASE_VISITORS.get(province, 2000)
+    
+    # Aplicar tendência de crescimento (5% ao ano desde 2024)
+    years_ahead = year - 2024
+    growth_factor = 1 + (years_ahead * 0.05)
+    
+    # Aplicar sazonalidade
+    seasonal_factor = SEASONAL_MULTIPLIERS.get(month, 1.0)
+    
+    # Calcular previsão
+    predicted = int(avg_historical * growth_factor * seasonal_factor)
+    
+    # Intervalo de confiança (±15%)
+    margin = int(predicted * 0.15)
+    confidence_interval = ConfidenceInterval(
+        lower=max(0, predicted - margin),
+        upper=predicted + margin
+    )
+    
+    return ForecastResponse(
+        province=province,
+        month=month,
+        year=year,
+        predicted_visitors=predicted,
+        confidence_interval=confidence_interval,
+        model_version="v0.1.0-baseline-fallback"
+    )
+
+
+def _model_forecast(province: str, month: int, year: int, prediction: dict) -> ForecastResponse:
+    """Converte a predição do modelo treinado em ForecastResponse."""
+    return ForecastResponse(
+        province=province,
+        month=month,
+        year=year,
+        predicted_visitors=prediction['predicted_visitors'],
+        confidence_interval=ConfidenceInterval(**prediction['confidence_interval']),
+        model_version="v1.0.0-rf-trained"
+    )
+
+
+def _split_model_version(model_version: str) -> tuple:
+    """"v1.0.0-rf-trained" -> ("v1.0.0", "rf-trained"): as colunas model_version têm 20 caracteres."""
+    version, _, variant = model_version.partition("-")
+    return version, variant or "model"
+
+
+def _log_forecasts(forecasts: List[ForecastResponse]):
+    """Enfileira as previsões servidas para gravação em lote em ml_predictions."""
+    writer = get_prediction_writer()
+    if not writer.enabled:
+        return
+    
+    created_at = datetime.utcnow()
+    rows = []
+    for forecast in forecasts:
+        version, variant = _split_model_version(forecast.model_version)
+        rows.append({
+            "model_name": f"forecast_{variant}",
+            "model_version": version,
+            "province": forecast.province,
+            "month": forecast.month,
+            "year": forecast.year,
+            "predicted_visitors": forecast.predicted_visitors,
+            "confidence_interval": forecast.confidence_interval.dict(),
+            "created_at": created_at
+        })
+    writer.submit_many(rows)
+
+
 @router.post("/forecast", response_model=ForecastResponse)
 async def forecast_visitors(
     request: ForecastRequest,
@@ -136,19 +333,15 @@ async def forecast_visitors(
     """
     
     # Validar província
-    valid_provinces = ["Luanda", "Benguela", "Huila", "Namibe", "Cunene", "Malanje"]
-    if request.province not in valid_provinces:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Província inválida. Use uma de: {', '.join(valid_provinces)}"
-        )
+    _validate_province(request.province)
     
-    forecast_service = get_forecast_service()
+    inference = get_inference_executor()
     
-    # Tentar usar modelo treinado
+    # Tentar usar modelo treinado (fora do event loop)
     prediction = None
     try:
-        prediction = forecast_service.predict(
+        prediction = await inference.run(
+            "forecast", "predict",
             province=request.province,
             year=request.year,
             month=request.month,
@@ -161,78 +354,92 @@ async def forecast_visitors(
     
     if prediction:
         # Modelo disponível - usar predição real
-        return ForecastResponse(
-            province=request.province,
-            month=request.month,
-            year=request.year,
-            predicted_visitors=prediction['predicted_visitors'],
-            confidence_interval=ConfidenceInterval(**prediction['confidence_interval']),
-            model_version="v1.0.0-rf-trained"
+        forecast = _model_forecast(request.province, request.month, request.year, prediction)
+    else:
+        # Fallback: modelo não disponível - usar baseline
+        averages = await _historical_averages(db, request.province, [request.month])
+        forecast = _baseline_forecast(
+            request.province, request.month, request.year, averages.get(request.month)
         )
     
-    # Fallback: modelo não disponível - usar baseline
-    province_base_visitors = {
-        "Luanda": 12000,
-        "Benguela": 4500,
-        "Huila": 3000,
-        "Namibe": 1500,
-        "Cunene": 800,
-        "Malanje": 2000,
-    }
+    _log_forecasts([forecast])
+    return forecast
+
+
+@router.post("/forecast/batch", response_model=BatchForecastResponse)
+async def forecast_visitors_batch(
+    request: BatchForecastRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Prevê visitantes para várias combinações província/mês/ano num só pedido
     
-    avg_historical = province_base_visitors.get(request.province, 2000)
+    Os itens são agrupados por província: cada modelo recebe uma única matriz
+    de features e devolve todas as previsões (com intervalos de confiança)
+    numa só chamada. Províncias sem modelo usam o mesmo fallback de
+    `/ml/forecast`, com uma única query de médias históricas por província.
     
-    # Try to get historical data from DB, fall back to province base on error
-    try:
-        query = select(
-            func.avg(
-                TourismStatistics.domestic_visitors + TourismStatistics.foreign_visitors
-            ).label("avg_visitors")
-        ).where(
-            and_(
-                TourismStatistics.province == request.province,
-                TourismStatistics.month == request.month
-            )
-        )
-        
-        result = await db.execute(query)
-        row = result.first()
-        
-        if row and row.avg_visitors is not None:
-            avg_historical = int(row.avg_visitors)
-    except Exception as db_err:
-        print(f"DB query error for forecast fallback ({request.province}): {db_err}")
-        # avg_historical already set from province_base_visitors
+    As previsões são devolvidas na mesma ordem dos itens do pedido.
+    """
     
-    # Aplicar tendência de crescimento (5% ao ano desde 2024)
-    years_ahead = request.year - 2024
-    growth_factor = 1 + (years_ahead * 0.05)
+    for item in request.items:
+        _validate_province(item.province)
     
-    # Aplicar sazonalidade
-    seasonal_multipliers = {
-        1: 1.3, 2: 0.9, 3: 0.8, 4: 0.9, 5: 0.95, 6: 1.0,
-        7: 1.25, 8: 1.2, 9: 0.9, 10: 0.85, 11: 0.95, 12: 1.4
-    }
-    seasonal_factor = seasonal_multipliers.get(request.month, 1.0)
+    # Agrupar índices dos itens por província
+    by_province = {}
+    for idx, item in enumerate(request.items):
+        by_province.setdefault(item.province, []).append(idx)
     
-    # Calcular previsão
-    predicted = int(avg_historical * growth_factor * seasonal_factor)
+    inference = get_inference_executor()
+    forecasts: List[Optional[ForecastResponse]] = [None] * len(request.items)
     
-    # Intervalo de confiança (±15%)
-    margin = int(predicted * 0.15)
-    confidence_interval = ConfidenceInterval(
-        lower=max(0, predicted - margin),
-        upper=predicted + margin
-    )
+    for province, indices in by_province.items():
+        items = [request.items[i] for i in indices]
+        
+        predictions = None
+        try:
+            predictions = await inference.run(
+                "forecast", "predict_batch",
+                province=province,
+                years=[item.year for item in items],
+                months=[item.month for item in items]
+            )
+        except Exception as e:
+            print(f"Error predicting batch with model for {province}: {e}")
+            predictions = None
+        
+        if predictions:
+            for i, item, prediction in zip(indices, items, predictions):
+                forecasts[i] = _model_forecast(province, item.month, item.year, prediction)
+            continue
+        
+        averages = await _historical_averages(db, province, sorted({item.month for item in items}))
+        for i, item in zip(indices, items):
+            forecasts[i] = _baseline_forecast(
+                province, item.month, item.year, averages.get(item.month)
+            )
     
-    return ForecastResponse(
-        province=request.province,
-        month=request.month,
-        year=request.year,
-        predicted_visitors=predicted,
-        confidence_interval=confidence_interval,
-        model_version="v0.1.0-baseline-fallback"
-    )
+    _log_forecasts(forecasts)
+    return BatchForecastResponse(forecasts=forecasts, total=len(forecasts))
+
+
+def _log_impressions(user_id: Optional[UUID], response: RecommendResponse):
+    """Enfileira as recomendações servidas (impressões) para recommendations_log."""
+    writer = get_impression_writer()
+    if not writer.enabled:
+        return
+    
+    version, _ = _split_model_version(response.model_version)
+    writer.submit_many([
+        {
+            "user_id": str(user_id) if user_id else None,
+            "destination_id": str(rec.destination_id),
+            "score": rec.score,
+            "model_version": version,
+            "created_at": response.generated_at
+        }
+        for rec in response.recommendations
+    ])
 
 
 @router.post("/recommend", response_model=RecommendResponse)
@@ -258,10 +465,11 @@ async def recommend_destinations(
     4. Retorna top N com scores e razões
     """
     
-    recommender_service = get_recommender_service()
+    inference = get_inference_executor()
     
-    # Try to use trained model
-    recommendations_data = recommender_service.recommend_by_preferences(
+    # Try to use trained model (off the event loop)
+    recommendations_data = await inference.run(
+        "recommender", "recommend_by_preferences",
         categories=request.preferences.categories,
         provinces=request.preferences.provinces,
         min_rating=None,  # No hard filter, let ranking decide
@@ -299,10 +507,12 @@ async def recommend_destinations(
                 )
             )
         
-        return RecommendResponse(
+        response = RecommendResponse(
             recommendations=recommendations,
             model_version="v1.0.0-content-based-trained"
         )
+        _log_impressions(request.user_id, response)
+        return response
     
     # Fallback: model not available - use database query
     # NOTE: preferences.categories are slugs/names (e.g. "natureza", "nature"),
@@ -371,10 +581,12 @@ async def recommend_destinations(
                 )
             )
         
-        return RecommendResponse(
+        response = RecommendResponse(
             recommendations=recommendations,
             model_version="v0.1.0-content-filter-fallback"
         )
+        _log_impressions(request.user_id, response)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -385,31 +597,8 @@ async def recommend_destinations(
         )
 
 
-@router.get("/segments", response_model=SegmentsResponse)
-async def get_tourist_segments():
-    """
-    Retorna perfis/clusters de turistas identificados
-    
-    **Usa modelo treinado:** K-Means clustering com 5 segmentos
-    Se o modelo não existir, usa fallback com perfis hardcoded.
-    
-    **Features do modelo:**
-    - Budget preference (low/medium/high)
-    - Trip duration (days)
-    - Activity preferences (beach, culture, nature, adventure, gastronomy)
-    - Travel frequency (trips per year)
-    - Group size
-    
-    **Algoritmo:**
-    1. Tenta carregar modelo K-Means treinado e metadata
-    2. Se existe, retorna segmentos do modelo real
-    3. Se não existe, fallback para perfis documentados
-    """
-    
-    clustering_service = get_clustering_service()
-    
-    # Try to use trained model
-    segments_data = clustering_service.get_segments()
+def _render_segments(segments_data: Optional[List[dict]]) -> SegmentsResponse:
+    """Constrói a resposta de segmentos a partir dos perfis do modelo (ou fallback)."""
     
     if segments_data:
         # Model available - use real clusters
@@ -548,6 +737,110 @@ async def get_tourist_segments():
     )
 
 
+# Resposta de /segments pré-serializada por versão dos artefactos: {mtime: (etag, bytes)}
+_segments_cache: dict = {}
+
+
+def _on_model_swapped(service: str):
+    """Descarta a resposta de /segments pré-serializada quando o clustering é trocado."""
+    if service == "clustering":
+        _segments_cache.clear()
+
+
+get_model_registry().add_listener(_on_model_swapped)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@router.get("/segments", response_model=SegmentsResponse)
+async def get_tourist_segments(if_none_match: Optional[str] = Header(default=None)):
+    """
+    Retorna perfis/clusters de turistas identificados
+    
+    **Usa modelo treinado:** K-Means clustering com 5 segmentos
+    Se o modelo não existir, usa fallback com perfis hardcoded.
+    
+    **Features do modelo:**
+    - Budget preference (low/medium/high)
+    - Trip duration (days)
+    - Activity preferences (beach, culture, nature, adventure, gastronomy)
+    - Travel frequency (trips per year)
+    - Group size
+    
+    **Algoritmo:**
+    1. Tenta carregar modelo K-Means treinado e metadata
+    2. Se existe, retorna segmentos do modelo real
+    3. Se não existe, fallback para perfis documentados
+    
+    **Cache:** a resposta é gerada uma vez por versão do modelo e servida como
+    JSON pré-serializado com `ETag`; pedidos com `If-None-Match` válido
+    recebem `304 Not Modified` sem corpo.
+    """
+    
+    # Chave = mtime dos metadados em disco (não a versão carregada): um modelo treinado
+    # depois do arranque muda a chave, e a resposta de fallback deixa de ser servida
+    version = get_clustering_service().artifact_state()['metadata']
+    cached = _segments_cache.get(version)
+    
+    if cached is None:
+        inference = get_inference_executor()
+        
+        # Try to use trained model (off the event loop)
+        segments_data = await inference.run("clustering", "get_segments")
+        body = _render_segments(segments_data).json().encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        
+        cached = (etag, body)
+        _segments_cache.clear()
+        _segments_cache[version] = cached
+    
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/segments/predict", response_model=SegmentPredictResponse)
+async def predict_user_segments(request: SegmentPredictRequest):
+    """
+    Atribui um segmento (cluster K-Means) a cada usuário do pedido
+    
+    Todos os perfis são normalizados e comparados com os centróides numa
+    única operação vetorizada, permitindo segmentar milhares de usuários
+    (ex: sincronização noturna com o CRM) num só pedido.
+    """
+    rows = [[getattr(user, name) for name in SEGMENT_FEATURES] for user in request.users]
+    
+    inference = get_inference_executor()
+    results = await inference.run("clustering", "predict_segments_batch", rows)
+    
+    if results is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo de clustering não disponível. Execute train_clustering.py."
+        )
+    
+    predictions = []
+    for user, result in zip(request.users, results):
+        segment = result['segment'] if result else None
+        predictions.append(UserSegmentPrediction(
+            user_id=user.user_id,
+            segment_id=f"cluster_{segment['cluster_id']}" if segment else None,
+            segment_name=segment['name'] if segment else None,
+            confidence=result['confidence'] if result else 0.0
+        ))
+    
+    return SegmentPredictResponse(predictions=predictions, total=len(predictions))
+
+
 # ============================================================================
 # Endpoint de modelos e métricas
 # ============================================================================
@@ -637,16 +930,60 @@ async def list_available_models(db: AsyncSession = Depends(get_db)):
 async def ml_health_check():
     """
     Verifica status do módulo ML
+    
+    Usa o inventário de modelos em cache (não carrega modelos).
     """
-    forecast_service = get_forecast_service()
-    available_models = forecast_service.list_available_models()
+    inventory = get_model_registry().inventory.get()
+    trained_models = inventory["forecast"]["available"]
     
     return {
         "status": "healthy",
         "module": "ml",
-        "endpoints": ["forecast", "recommend", "segments", "models"],
-        "trained_models": len(available_models),
-        "model_status": "trained models available" if available_models else "using fallback",
+        "endpoints": ["forecast", "forecast/batch", "recommend", "segments", "segments/predict", "models", "metrics"],
+        "trained_models": trained_models,
+        "model_status": "trained models available" if trained_models else "using fallback",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@probes_router.get("/health/live")
+async def ml_liveness():
+    """
+    Liveness probe: o processo responde (sem I/O nem acesso a modelos)
+    """
+    return {"status": "alive"}
+
+
+@probes_router.get("/health/ready")
+async def ml_readiness():
+    """
+    Readiness probe: 503 enquanto o warm-up dos modelos não terminou
+    
+    Responde a partir do inventário em cache, atualizado no warm-up e a cada
+    verificação do registo de modelos.
+    """
+    if not get_warmup_state().ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    
+    return {"status": "ready", "models": get_model_registry().inventory.get()}
+
+
+@router.get("/metrics")
+async def ml_metrics():
+    """
+    Métricas internas do módulo ML (caches, filas) para monitorização
+    """
+    forecast_service = get_forecast_service()
+    
+    return {
+        "forecast_cache": forecast_service.cache_stats(),
+        "inference_executor": get_inference_executor().stats(),
+        "db_pool": pool_stats(),
+        "historical_averages": get_historical_averages().stats(),
+        "prediction_writer": get_prediction_writer().stats(),
+        "impression_writer": get_impression_writer().stats(),
+        "jobs": get_job_runner().stats(),
+        "model_registry": get_model_registry().stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -655,15 +992,10 @@ async def ml_health_check():
 # Endpoints de Jobs (fila de treino/inferência)
 # ============================================================================
 
-import uuid as _uuid_mod
-
-# In-memory job store (resets on restart, acceptable for demo/staging)
-_jobs_store: dict = {}
-
 
 class JobCreateRequest(BaseModel):
     """Request para criar um job de ML"""
-    type: str = Field(..., description="Tipo do job: retrain, inference, export")
+    type: str = Field(..., description="Tipo do job: retrain, evaluate, inference, export, sync")
     payload: Optional[dict] = Field(default=None, description="Dados adicionais para o job")
 
 
@@ -671,9 +1003,10 @@ class JobItem(BaseModel):
     """Item de job ML"""
     id: str
     type: str
-    status: str = Field(..., description="pending | running | finished | failed")
+    status: str = Field(..., description="pending | running | finished | failed | cancelled")
     progress: Optional[int] = Field(default=0)
     created_at: str
+    started_at: Optional[str] = None
     finished_at: Optional[str] = None
     result_url: Optional[str] = None
     logs: list = Field(default_factory=list)
@@ -687,63 +1020,36 @@ class JobsListResponse(BaseModel):
 
 
 @router.get("/jobs", response_model=JobsListResponse)
-async def list_jobs():
+async def list_jobs(limit: int = Query(default=100, ge=1, le=1000)):
     """
-    Lista todos os jobs de ML (treino, inferência, exportação).
-    Jobs são armazenados em memória — resetam ao reiniciar o serviço.
+    Lista os jobs de ML (treino, avaliação, inferência, exportação).
+    Jobs são persistidos num store SQLite local — sobrevivem a reinícios
+    e são visíveis a partir de todos os workers.
     """
-    jobs = list(_jobs_store.values())
-    # Sort by created_at descending
-    jobs.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    jobs = await get_job_runner().list(limit=limit)
     return JobsListResponse(data=jobs, meta={"total": len(jobs)})
 
 
 @router.post("/jobs", response_model=JobItem)
 async def create_job(request: JobCreateRequest):
     """
-    Cria um novo job de ML (treino, inferência, etc).
-    Em ambiente de produção, isso poderia enfileirar uma tarefa assíncrona real.
+    Cria um novo job de ML.
+    
+    - **retrain**: executa `scripts/train_forecast_baseline.py`
+    - **evaluate**: executa `scripts/evaluate_models.py`
+    - restantes tipos não têm pipeline associado e terminam de imediato
+    
+    Cada pipeline corre num subprocesso; o stdout é anexado aos logs do job e
+    as linhas "[i/n]" atualizam o progresso. O número de jobs em execução por
+    tipo é limitado por JOBS_CONCURRENCY.
     """
-    valid_types = ["retrain", "inference", "export", "evaluate", "sync"]
-    if request.type not in valid_types:
+    if request.type not in JOB_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"Tipo de job inválido. Use um de: {', '.join(valid_types)}"
+            detail=f"Tipo de job inválido. Use um de: {', '.join(JOB_TYPES)}"
         )
     
-    job_id = str(_uuid_mod.uuid4())
-    now = datetime.utcnow().isoformat()
-    
-    job = {
-        "id": job_id,
-        "type": request.type,
-        "status": "pending",
-        "progress": 0,
-        "created_at": now,
-        "finished_at": None,
-        "result_url": None,
-        "logs": [
-            f"[{now}] Job {request.type} criado",
-            f"[{now}] Aguardando execução..."
-        ],
-        "payload": request.payload or {}
-    }
-    
-    _jobs_store[job_id] = job
-    
-    # Simulate job completion for demo purposes (mark as finished after creation)
-    import asyncio
-    async def _simulate_job(jid: str, jtype: str):
-        await asyncio.sleep(2)
-        if jid in _jobs_store:
-            ts = datetime.utcnow().isoformat()
-            _jobs_store[jid]["status"] = "finished"
-            _jobs_store[jid]["progress"] = 100
-            _jobs_store[jid]["finished_at"] = ts
-            _jobs_store[jid]["logs"].append(f"[{ts}] Job {jtype} concluído com sucesso")
-    
-    asyncio.create_task(_simulate_job(job_id, request.type))
-    
+    job = await get_job_runner().submit(request.type, request.payload)
     return JobItem(**job)
 
 
@@ -752,7 +1058,7 @@ async def get_job(job_id: str):
     """
     Retorna o estado de um job de ML pelo ID.
     """
-    job = _jobs_store.get(job_id)
+    job = await get_job_runner().get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado")
     return JobItem(**job)
@@ -762,20 +1068,18 @@ async def get_job(job_id: str):
 async def cancel_job(job_id: str):
     """
     Cancela um job de ML pendente ou em execução.
+    Jobs em execução têm o subprocesso terminado (SIGTERM, depois SIGKILL).
     """
-    job = _jobs_store.get(job_id)
+    runner = get_job_runner()
+    job = await runner.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado")
     
-    if job["status"] in ("finished", "failed"):
+    if job["status"] in ("finished", "failed", "cancelled"):
         raise HTTPException(
             status_code=409,
             detail=f"Job já está no estado '{job['status']}' e não pode ser cancelado"
         )
     
-    ts = datetime.utcnow().isoformat()
-    job["status"] = "failed"
-    job["finished_at"] = ts
-    job["logs"].append(f"[{ts}] Job cancelado pelo utilizador")
-    
+    job = await runner.cancel(job_id)
     return JobItem(**job)
@@ -10,6 +10,8 @@ router = APIRouter()
 
 # Incluir rotas de ML protegidas pela API Key
 router.include_router(ml.router, dependencies=[Depends(verify_ml_api_key)])
+# Probes do orquestrador (liveness/readiness) não levam API Key
+router.include_router(ml.probes_router)
 
 
 class HealthResp(BaseModel):
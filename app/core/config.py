@@ -7,6 +7,67 @@ class Settings(BaseSettings):
     PORT: int = 8000
     ML_API_KEY: str = "wenda-ml-internal-secret-key"
 
+    # Database connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg statement caches (use 0 for both behind pgbouncer/Neon pooler)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+
+    # Forecast prediction cache
+    FORECAST_CACHE_MAX_SIZE: int = 4096
+    FORECAST_CACHE_TTL_SECONDS: float = 3600.0
+    # Load forecast_{province}.forest.npz (no sklearn) when present instead of the .joblib
+    FORECAST_FLAT_ARTIFACTS: bool = True
+    # Serve provinces covered by models/global_forecast.* from that single model
+    FORECAST_GLOBAL_MODEL: bool = False
+
+    # Model warm-up at startup
+    WARMUP_ON_STARTUP: bool = True
+    WARMUP_WORKERS: int = 4
+
+    # Inference executor (blocking model work runs off the event loop)
+    INFERENCE_THREAD_WORKERS: int = 4
+    INFERENCE_PROCESS_WORKERS: int = 0
+    # Comma-separated services routed to the process pool (e.g. "forecast,clustering")
+    INFERENCE_PROCESS_SERVICES: str = ""
+
+    # Memory-map recommender matrices (shared read-only across worker processes)
+    RECOMMENDER_MMAP: bool = True
+
+    # Pure-NumPy nearest-centroid path for segment prediction (False = sklearn)
+    CLUSTERING_FAST_PATH: bool = True
+
+    # Hot-swap of retrained artifacts in models/ (0 = never reload after first load)
+    MODEL_RELOAD_INTERVAL_SECONDS: float = 30.0
+    MODEL_RELOAD_SETTLE_SECONDS: float = 2.0
+
+    # In-memory province x month averages for the forecast fallback (0 = load once)
+    HISTORICAL_REFRESH_SECONDS: float = 300.0
+
+    # Write-behind persistence (batched inserts off the request path)
+    LOG_PREDICTIONS: bool = True
+    LOG_RECOMMENDATIONS: bool = True
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_FLUSH_MS: float = 1000.0
+    WRITE_BEHIND_QUEUE_SIZE: int = 10000
+
+    # ML jobs (/ml/jobs): SQLite store shared by all workers, per-type concurrency
+    JOBS_DB_PATH: str = "jobs.sqlite3"
+    JOBS_CONCURRENCY: str = "retrain=1,evaluate=1"
+    JOBS_POLL_SECONDS: float = 1.0
+    JOBS_TIMEOUT_SECONDS: float = 3600.0
+    JOBS_LOG_LINES: int = 200
+    # Workers heartbeat this often; jobs of a worker silent for 6 beats are recovered
+    JOBS_HEARTBEAT_SECONDS: float = 5.0
+    # Forecast training run by retrain jobs: parallel provinces (0 = one per core)
+    # and threads per model (0 = cores // TRAIN_WORKERS)
+    TRAIN_WORKERS: int = 1
+    TRAIN_THREADS_PER_MODEL: int = 0
+
     class Config:
         env_file = ".env"
 
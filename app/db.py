@@ -1,7 +1,11 @@
 import re
 import ssl
+import threading
+import time
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
 
@@ -27,7 +31,109 @@ if any(x in database_url for x in ["sslmode=require", "ssl=require", "ssl=true",
 if "?" not in database_url and "&" in database_url:
     database_url = database_url.replace("&", "?", 1)
 
-engine = create_async_engine(database_url, connect_args=connect_args, future=True, echo=False)
+# asyncpg prepared statement caches. Set both to 0 behind a transaction-mode
+# pooler (pgbouncer / Neon pooler), which cannot keep prepared statements.
+connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+database_url += ("&" if "?" in database_url else "?") + (
+    f"prepared_statement_cache_size={settings.DB_PREPARED_STATEMENT_CACHE_SIZE}"
+)
+
+
+class PoolMetrics:
+    """Checkout wait times and connection counters for the engine pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_errors = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.connections_created = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, seconds: float, failed: bool):
+        with self._lock:
+            if failed:
+                self.checkout_errors += 1
+                return
+            self.checkouts += 1
+            self.checkout_seconds_total += seconds
+            self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connections_created += 1
+
+    def record_invalidate(self):
+        with self._lock:
+            self.invalidated += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkout_errors': self.checkout_errors,
+                'checkout_wait_avg_ms': round(
+                    self.checkout_seconds_total / self.checkouts * 1000, 3
+                ) if self.checkouts else 0.0,
+                'checkout_wait_max_ms': round(self.checkout_seconds_max * 1000, 3),
+                'connections_created': self.connections_created,
+                'invalidated': self.invalidated,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that times each checkout (queue wait, connect and pre-ping)."""
+
+    def connect(self):
+        start = time.perf_counter()
+        failed = True
+        try:
+            conn = super().connect()
+            failed = False
+            return conn
+        finally:
+            pool_metrics.record_checkout(time.perf_counter() - start, failed)
+
+
+engine = create_async_engine(
+    database_url,
+    connect_args=connect_args,
+    poolclass=InstrumentedAsyncPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    future=True,
+    echo=False,
+)
+
+
+@event.listens_for(engine.sync_engine.pool, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.record_connect()
+
+
+@event.listens_for(engine.sync_engine.pool, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.record_invalidate()
+
+
+def pool_stats() -> dict:
+    """Pool gauges (size, in use, overflow) plus checkout counters."""
+    pool = engine.sync_engine.pool
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'in_use': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        **pool_metrics.to_dict(),
+    }
 
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
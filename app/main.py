@@ -1,7 +1,15 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import Response, JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from app.api.routes import router as api_router
+from app.core.config import settings
+from app.services.executor import get_inference_executor
+from app.services.historical import historical_refresh_loop
+from app.services.jobs import get_job_runner
+from app.services.registry import get_model_registry
+from app.services.write_behind import all_writers
+from app.services.warmup import get_warmup_state, warm_up_models
 
 
 # ---------------------------------------------------------------------------
@@ -21,22 +29,52 @@ CORS_HEADERS = {
 }
 
 
-class CORSMiddleware(BaseHTTPMiddleware):
-    """Injects CORS headers on every response, handles OPTIONS preflights."""
+# Precomputed raw ASGI header pairs (lowercase names, latin-1 bytes)
+CORS_HEADER_PAIRS = [
+    (name.lower().encode("latin-1"), value.encode("latin-1"))
+    for name, value in CORS_HEADERS.items()
+]
+_CORS_HEADER_NAMES = {name for name, _ in CORS_HEADER_PAIRS}
+_PREFLIGHT_HEADERS = [(b"content-length", b"0")] + CORS_HEADER_PAIRS
+
+
+class CORSMiddleware:
+    """Injects CORS headers on every response, handles OPTIONS preflights.
+
+    Pure ASGI: headers are added to the `http.response.start` message as it
+    passes through, without wrapping the request in extra tasks or streams.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
         # Immediately handle OPTIONS preflight — no further processing needed
-        if request.method == "OPTIONS":
-            resp = Response(status_code=200, content="")
-            for k, v in CORS_HEADERS.items():
-                resp.headers[k] = v
-            return resp
+        if scope["method"] == "OPTIONS":
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": _PREFLIGHT_HEADERS,
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
 
         # For all other methods, proceed normally and inject CORS headers
-        response = await call_next(request)
-        for k, v in CORS_HEADERS.items():
-            response.headers[k] = v
-        return response
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() not in _CORS_HEADER_NAMES
+                ]
+                headers.extend(CORS_HEADER_PAIRS)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
 
 
 app = FastAPI(
@@ -50,6 +88,71 @@ app.add_middleware(CORSMiddleware)
 
 app.include_router(api_router, prefix="/api")
 
+_background_tasks = set()
+
+
+@app.on_event("startup")
+async def start_model_warmup():
+    """Load model artifacts in the background; /health reports ready once done."""
+    state = get_warmup_state()
+    if not settings.WARMUP_ON_STARTUP:
+        state.ready = True
+        return
+
+    task = asyncio.create_task(warm_up_models(state))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@app.on_event("startup")
+async def start_historical_refresh():
+    """Keep the forecast fallback averages in memory, refreshed periodically."""
+    task = asyncio.create_task(historical_refresh_loop(settings.HISTORICAL_REFRESH_SECONDS))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@app.on_event("startup")
+async def start_model_registry():
+    """Watch models/ and hot-swap retrained artifacts."""
+    task = asyncio.create_task(get_model_registry().run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@app.on_event("startup")
+async def start_write_behind():
+    for writer in all_writers():
+        writer.start()
+
+
+@app.on_event("startup")
+async def start_job_runner():
+    """Start the job supervisor: heartbeats, and recovery of jobs left by exited workers."""
+    get_job_runner().start()
+
+
+@app.on_event("shutdown")
+async def stop_job_runner():
+    await get_job_runner().shutdown()
+
+
+@app.on_event("shutdown")
+async def flush_write_behind():
+    for writer in all_writers():
+        await writer.stop()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in list(_background_tasks):
+        task.cancel()
+
+
+@app.on_event("shutdown")
+async def stop_inference_executor():
+    get_inference_executor().shutdown(wait=False)
+
 
 @app.get("/")
 async def root():
@@ -58,4 +161,14 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "service": "wenda-ml-backend"}
+    state = get_warmup_state()
+    if not state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "service": "wenda-ml-backend"}
+        )
+    return {
+        "status": "ok",
+        "service": "wenda-ml-backend",
+        "warmup": state.to_dict()
+    }
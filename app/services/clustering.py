@@ -5,6 +5,7 @@ This module:
 - Loads K-Means clustering model from disk
 - Provides segment information from metadata
 - Can predict segment for new user based on preferences
+- Folds the StandardScaler into the centroids for a pure-NumPy inference path
 """
 
 import json
@@ -13,63 +14,92 @@ from typing import Optional, List, Dict
 import numpy as np
 import joblib
 
+from app.core.config import settings
+from app.services.registry import SnapshotService
+
 
 MODEL_DIR = Path("models")
 
+# Feature order used at training time (see scripts/train_clustering.py)
+FEATURE_ORDER = [
+    'budget', 'trip_duration', 'beach_pref', 'culture_pref', 'nature_pref',
+    'adventure_pref', 'gastronomy_pref', 'trips_per_year', 'group_size'
+]
+
 
-class ClusteringService:
-    """Singleton service to manage clustering model."""
+class ClusteringModel:
+    """One loaded version of the clustering artifacts (immutable once built)."""
     
-    def __init__(self):
-        self._model: Optional[any] = None
-        self._scaler: Optional[any] = None
-        self._metadata: Optional[dict] = None
-        self._loaded = False
-        
-    def _load_model(self):
-        """Load model from disk if not already loaded."""
-        if self._loaded:
-            return
-        
-        model_path = MODEL_DIR / "clustering_kmeans.joblib"
-        scaler_path = MODEL_DIR / "clustering_scaler.joblib"
-        metadata_path = MODEL_DIR / "clustering_metadata.json"
+    def __init__(self, model, scaler, metadata: dict, state: Dict[str, Optional[int]]):
+        self.model = model
+        self.scaler = scaler
+        self.metadata = metadata
+        self.state = state
+        self.version = str(state['metadata'])
+        self.profiles_by_id: Dict[int, Dict] = {
+            p['cluster_id']: p for p in metadata.get('cluster_profiles', [])
+        }
         
-        if not model_path.exists() or not metadata_path.exists():
+        # (x - mean) / scale - center == x * inv_scale - (center + mean * inv_scale),
+        # so scaling + distance becomes one multiply and one subtract per centroid
+        mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else 0.0
+        scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else 1.0
+        n_features = model.cluster_centers_.shape[1]
+        self.inv_scale = np.broadcast_to(1.0 / np.asarray(scale, dtype=np.float64), (n_features,)).copy()
+        self.folded_centers = model.cluster_centers_ + np.asarray(mean, dtype=np.float64) * self.inv_scale
+
+
+class ClusteringService(SnapshotService):
+    """Singleton service to manage clustering model.
+    
+    The loaded artifacts live in one ClusteringModel snapshot; a reload builds
+    a new snapshot and swaps the reference, so requests never see a mix.
+    """
+    
+    def _artifact_paths(self) -> Dict[str, Path]:
+        return {
+            'model': MODEL_DIR / "clustering_kmeans.joblib",
+            'scaler': MODEL_DIR / "clustering_scaler.joblib",
+            'metadata': MODEL_DIR / "clustering_metadata.json",
+        }
+    
+    def _build_snapshot(self, state: Dict[str, Optional[int]]) -> Optional[ClusteringModel]:
+        paths = self._artifact_paths()
+        if not paths['model'].exists() or not paths['metadata'].exists():
             print("Clustering model not found. Run train_clustering.py first.")
-            return
+            return None
         
         try:
-            self._model = joblib.load(model_path)
-            self._scaler = joblib.load(scaler_path)
-            
-            with open(metadata_path, 'r') as f:
-                self._metadata = json.load(f)
-            
-            self._loaded = True
+            model = joblib.load(paths['model'])
+            scaler = joblib.load(paths['scaler'])
+            with open(paths['metadata'], 'r') as f:
+                metadata = json.load(f)
+            return ClusteringModel(model, scaler, metadata, state)
         except Exception as e:
             print(f"Error loading clustering model: {e}")
+            return None
     
     def get_segments(self) -> Optional[List[Dict]]:
         """Get all tourist segments with their profiles."""
-        self._load_model()
+        snapshot = self._load_model()
         
-        if not self._loaded or not self._metadata:
+        if snapshot is None:
             return None
         
-        return self._metadata.get('cluster_profiles', [])
+        return snapshot.metadata.get('cluster_profiles', [])
     
     def get_model_info(self) -> Optional[Dict]:
         """Get clustering model metadata."""
-        self._load_model()
+        snapshot = self._load_model()
         
-        if not self._loaded or not self._metadata:
+        if snapshot is None:
             return None
         
         return {
-            'n_clusters': self._metadata.get('n_clusters'),
-            'silhouette_score': self._metadata.get('silhouette_score'),
-            'n_samples': self._metadata.get('n_samples'),
+            'n_clusters': snapshot.metadata.get('n_clusters'),
+            'silhouette_score': snapshot.metadata.get('silhouette_score'),
+            'n_samples': snapshot.metadata.get('n_samples'),
+            'version': snapshot.version,
             'loaded': True
         }
     
@@ -102,39 +132,71 @@ class ClusteringService:
         Returns:
             Dictionary with segment information
         """
-        self._load_model()
-        
-        if not self._loaded or self._model is None:
-            return None
-        
-        # Prepare features (same order as training)
-        features = np.array([[
+        results = self.predict_segments_batch([[
             budget, trip_duration, beach_pref, culture_pref,
             nature_pref, adventure_pref, gastronomy_pref,
             trips_per_year, group_size
         ]])
         
-        # Scale features
-        features_scaled = self._scaler.transform(features)
-        
-        # Predict cluster
-        cluster_id = int(self._model.predict(features_scaled)[0])
+        if not results:
+            return None
+        return results[0]
+    
+    def _assign_sklearn(self, X: np.ndarray, snapshot: Optional[ClusteringModel] = None) -> tuple:
+        """Nearest centroid via StandardScaler.transform + KMeans.predict."""
+        snapshot = snapshot or self._load_model()
+        X_scaled = snapshot.scaler.transform(X)
+        cluster_ids = snapshot.model.predict(X_scaled)
+        distances = np.linalg.norm(X_scaled - snapshot.model.cluster_centers_[cluster_ids], axis=1)
+        return cluster_ids, distances
+    
+    def _assign_numpy(self, X: np.ndarray, snapshot: Optional[ClusteringModel] = None) -> tuple:
+        """Nearest centroid against the scaler-folded centroids, without sklearn validation."""
+        snapshot = snapshot or self._load_model()
+        diff = (X * snapshot.inv_scale)[:, None, :] - snapshot.folded_centers[None, :, :]
+        sq_distances = np.einsum('ijk,ijk->ij', diff, diff)
+        cluster_ids = np.argmin(sq_distances, axis=1)
+        distances = np.sqrt(sq_distances[np.arange(len(X)), cluster_ids])
+        return cluster_ids, distances
+    
+    def predict_segments_batch(self, features: List[List[float]]) -> Optional[List[Optional[Dict]]]:
+        """
+        Predict segments for many users in one vectorized pass.
         
-        # Get cluster profile
-        cluster_profiles = self._metadata.get('cluster_profiles', [])
-        segment = next((p for p in cluster_profiles if p['cluster_id'] == cluster_id), None)
+        Args:
+            features: one row per user, columns in FEATURE_ORDER
+            
+        Returns:
+            One {'segment', 'confidence'} dict per user (None if the predicted
+            cluster has no profile), in input order; None if model not available
+        """
+        snapshot = self._load_model()
         
-        if not segment:
+        if snapshot is None:
             return None
         
-        # Calculate similarity/confidence (distance to cluster center)
-        distance = float(np.linalg.norm(features_scaled - self._model.cluster_centers_[cluster_id]))
-        confidence = max(0, 1 - (distance / 3))  # Normalize to 0-1
+        X = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_ORDER))
         
-        return {
-            'segment': segment,
-            'confidence': round(confidence, 2)
-        }
+        if settings.CLUSTERING_FAST_PATH:
+            cluster_ids, distances = self._assign_numpy(X, snapshot)
+        else:
+            cluster_ids, distances = self._assign_sklearn(X, snapshot)
+        
+        # Calculate similarity/confidence (distance to cluster center)
+        confidences = np.maximum(0, 1 - (distances / 3))  # Normalize to 0-1
+        
+        results = []
+        for cluster_id, confidence in zip(cluster_ids, confidences):
+            segment = snapshot.profiles_by_id.get(int(cluster_id))
+            if not segment:
+                results.append(None)
+                continue
+            results.append({
+                'segment': segment,
+                'confidence': round(float(confidence), 2)
+            })
+        
+        return results
 
 
 # Global singleton instance
@@ -0,0 +1,179 @@
+"""
+Inference Executor - Run blocking model work off the asyncio event loop.
+
+This module:
+- Dispatches service calls (model loads, sklearn/NumPy inference) to worker pools
+- Uses a thread pool by default (NumPy releases the GIL for most heavy work)
+- Optionally routes selected services to a process pool for GIL-bound sklearn work
+- Tracks in-flight and queue-depth metrics per pool
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.clustering import get_clustering_service
+from app.services.forecast import get_forecast_service
+from app.services.recommender import get_recommender_service
+
+
+SERVICE_GETTERS = {
+    'forecast': get_forecast_service,
+    'recommender': get_recommender_service,
+    'clustering': get_clustering_service,
+}
+
+
+def _invoke(service: str, method: str, args: tuple, kwargs: dict) -> Any:
+    """Call a method on a service singleton (in whichever process runs this)."""
+    return getattr(SERVICE_GETTERS[service](), method)(*args, **kwargs)
+
+
+class _PoolMetrics:
+    """Counters for one worker pool."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finish(self, seconds: float, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.total_seconds += seconds
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'in_flight': self.in_flight,
+                'queue_depth': max(0, self.in_flight - self.workers),
+                'max_in_flight': self.max_in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_seconds': round(self.total_seconds / done, 4) if done else 0.0
+            }
+
+
+class InferenceExecutor:
+    """Thread/process pools that services dispatch blocking calls into."""
+
+    def __init__(
+        self,
+        thread_workers: int = 4,
+        process_workers: int = 0,
+        process_services: Optional[set] = None
+    ):
+        self._thread_workers = max(1, thread_workers)
+        self._process_workers = max(0, process_workers)
+        self._process_services = set(process_services or ()) if self._process_workers else set()
+        self._pools: Dict[str, Executor] = {}
+        self._metrics = {
+            'thread': _PoolMetrics(self._thread_workers),
+            'process': _PoolMetrics(self._process_workers),
+        }
+        self._lock = threading.Lock()
+
+    def _pool(self, kind: str) -> Executor:
+        with self._lock:
+            pool = self._pools.get(kind)
+            if pool is None:
+                if kind == 'process':
+                    # spawn: forking a process that already runs threads is unsafe
+                    pool = ProcessPoolExecutor(
+                        max_workers=self._process_workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                else:
+                    pool = ThreadPoolExecutor(
+                        max_workers=self._thread_workers,
+                        thread_name_prefix="inference"
+                    )
+                self._pools[kind] = pool
+            return pool
+
+    def pool_kind(self, service: str) -> str:
+        return 'process' if service in self._process_services else 'thread'
+
+    async def run(self, service: str, method: str, *args, **kwargs) -> Any:
+        """
+        Run `get_<service>_service().<method>(*args, **kwargs)` in a worker pool.
+
+        Args:
+            service: one of 'forecast', 'recommender', 'clustering'
+            method: public service method name
+        """
+        if service not in SERVICE_GETTERS:
+            raise ValueError(f"Unknown service: {service}")
+
+        kind = self.pool_kind(service)
+        metrics = self._metrics[kind]
+        loop = asyncio.get_running_loop()
+
+        metrics.start()
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await loop.run_in_executor(
+                self._pool(kind), _invoke, service, method, args, kwargs
+            )
+            failed = False
+            return result
+        finally:
+            metrics.finish(time.perf_counter() - start, failed)
+
+    def recycle(self, kind: str):
+        """Replace a pool with a fresh one on next use; in-flight calls finish on the old pool."""
+        with self._lock:
+            pool = self._pools.pop(kind, None)
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            'process_services': sorted(self._process_services),
+            'pools': {kind: m.to_dict() for kind, m in self._metrics.items()}
+        }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _parse_services(value: str) -> set:
+    return {s.strip() for s in value.split(',') if s.strip()}
+
+
+_inference_executor = InferenceExecutor(
+    thread_workers=settings.INFERENCE_THREAD_WORKERS,
+    process_workers=settings.INFERENCE_PROCESS_WORKERS,
+    process_services=_parse_services(settings.INFERENCE_PROCESS_SERVICES)
+)
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get the singleton inference executor."""
+    return _inference_executor
@@ -5,88 +5,411 @@ This module:
 - Loads per-province forecast models from disk (lazy loading with cache)
 - Provides prediction functions for the API
 - Handles model fallback if a model is not available
+- Rebuilds only the provinces whose artifact changed when reload() is called
 """
 
 import os
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, List, Tuple
 import json
 import numpy as np
 import joblib
 from datetime import datetime
 
+from app.core.config import settings
+from app.services.cache import TTLCache
+from app.services.forest import FlatForest
+
 
 MODEL_DIR = Path("models")
 
+# Optional multi-province model (see scripts/train_forecast_baseline.py)
+GLOBAL_MODEL_NAME = "global_forecast"
+
+
+class ForecastModel:
+    """One loaded version of a province's forecast artifacts (immutable once built).
+    
+    Built either from a pickled sklearn forest (flattened at load time) or
+    directly from a flat-forest .npz, in which case `model` is None and
+    prediction never touches sklearn.
+    
+    With the global multi-province model, every province gets its own
+    ForecastModel sharing one forest; `province_index` selects the one-hot
+    province column appended to the features.
+    """
+    
+    def __init__(
+        self,
+        model: any,
+        metrics: dict,
+        version: Optional[tuple],
+        forest: Optional[FlatForest] = None,
+        path: Optional[Path] = None,
+        province_index: Optional[int] = None,
+        n_provinces: int = 0
+    ):
+        self.model = model
+        self.metrics = metrics
+        self.version = version
+        self.path = path
+        self.province_index = province_index
+        self.n_provinces = n_provinces
+        # Flatten forest once so CI estimation is a single vectorized pass
+        self.forest = forest if forest is not None else FlatForest.from_sklearn(model)
+    
+    def encode(self, X: np.ndarray) -> np.ndarray:
+        """Append the one-hot province columns expected by a global model."""
+        if self.province_index is None:
+            return X
+        one_hot = np.zeros((X.shape[0], self.n_provinces))
+        one_hot[:, self.province_index] = 1.0
+        return np.hstack([X, one_hot])
+
 
 class ForecastService:
-    """Singleton service to manage forecast models."""
+    """Singleton service to manage forecast models.
+    
+    Each province maps to a ForecastModel snapshot; a reload builds the new
+    snapshot first and then replaces the dict entry, so a failed or partial
+    reload keeps serving the previous version.
+    """
     
     def __init__(self):
-        self._models: Dict[str, any] = {}
-        self._metrics: Dict[str, dict] = {}
-        self._prediction_cache: Dict[tuple, dict] = {}
+        self._models: Dict[str, ForecastModel] = {}
+        self._global_meta: Optional[Tuple[int, dict]] = None
+        self._global_model: Optional[tuple] = None
+        self._global_failed: Optional[tuple] = None
+        self._global_lock = threading.Lock()
+        # One lock per province: a slow load only blocks requests for that province
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._prediction_cache = TTLCache(
+            max_size=settings.FORECAST_CACHE_MAX_SIZE,
+            ttl_seconds=settings.FORECAST_CACHE_TTL_SECONDS
+        )
         
     def _normalize_province(self, province: str) -> str:
         """Normalize province name to match file naming."""
         return province.replace(' ', '_')
     
-    def _load_model(self, province: str) -> Optional[any]:
-        """Load model from disk if not already cached."""
-        normalized = self._normalize_province(province)
+    def _pick_artifact(self, name: str) -> Optional[Path]:
+        """
+        models/{name}.forest.npz or models/{name}.joblib, None if neither exists.
         
-        if normalized in self._models:
-            return self._models[normalized]
+        The flat-forest .npz is preferred unless the .joblib is newer (a
+        retrain that has not been exported yet).
+        """
+        joblib_path = MODEL_DIR / f"{name}.joblib"
+        flat_path = MODEL_DIR / f"{name}.forest.npz"
+        try:
+            joblib_mtime = joblib_path.stat().st_mtime_ns
+        except OSError:
+            joblib_mtime = None
         
-        model_path = MODEL_DIR / f"forecast_{normalized}.joblib"
-        metrics_path = MODEL_DIR / f"metrics_{normalized}.json"
+        if settings.FORECAST_FLAT_ARTIFACTS:
+            try:
+                flat_mtime = flat_path.stat().st_mtime_ns
+            except OSError:
+                flat_mtime = None
+            if flat_mtime is not None and (joblib_mtime is None or flat_mtime >= joblib_mtime):
+                return flat_path
         
-        if not model_path.exists():
+        return joblib_path if joblib_mtime is not None else None
+    
+    def _global_metadata(self) -> Optional[Tuple[int, dict]]:
+        """(mtime_ns, metadata) of the global model, None if disabled or not trained."""
+        if not settings.FORECAST_GLOBAL_MODEL:
             return None
         
+        path = MODEL_DIR / f"{GLOBAL_MODEL_NAME}_metadata.json"
         try:
-            model = joblib.load(model_path)
-            self._models[normalized] = model
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return None
+        
+        cached = self._global_meta
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, 'r') as f:
+                    cached = (mtime, json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Error reading global forecast metadata: {e}")
+                return None
+            self._global_meta = cached
+        return cached
+    
+    def _global_version(self, normalized: str) -> Optional[tuple]:
+        """
+        Version token of the global artifact if it serves this province.
+        
+        None if the global model is disabled, does not list the province, its
+        artifact is missing or this version already failed to load; the
+        province then falls back to its own forecast_{province} artifact.
+        """
+        meta = self._global_metadata()
+        if meta is None or normalized not in meta[1].get('provinces', []):
+            return None
+        path = self._pick_artifact(GLOBAL_MODEL_NAME)
+        if path is None:
+            return None
+        try:
+            version = (path.name, path.stat().st_mtime_ns, meta[0])
+        except OSError:
+            return None
+        return None if version == self._global_failed else version
+    
+    def _model_version(self, normalized: str) -> Optional[tuple]:
+        """Version token of the model artifact on disk (file name + mtime), None if missing."""
+        version = self._global_version(normalized)
+        if version is not None:
+            return version
+        path = self._pick_artifact(f"forecast_{normalized}")
+        if path is None:
+            return None
+        try:
+            return (path.name, path.stat().st_mtime_ns)
+        except OSError:
+            return None
+    
+    def _read_artifact(self, path: Path) -> Tuple[any, Optional[FlatForest]]:
+        if path.suffix == '.npz':
+            # Plain arrays: no unpickling and no sklearn import
+            return None, FlatForest.load(path)
+        return joblib.load(path), None
+    
+    def _build_global(self, normalized: str, version: tuple) -> Optional[ForecastModel]:
+        model_path = MODEL_DIR / version[0]
+        
+        # One artifact for all provinces: load it once per version and share it
+        with self._global_lock:
+            shared = self._global_model
+            if shared is None or shared[0] != version:
+                if version == self._global_failed:
+                    return None
+                try:
+                    model, forest = self._read_artifact(model_path)
+                    if forest is None:
+                        forest = FlatForest.from_sklearn(model)
+                except Exception as e:
+                    print(f"Error loading global forecast model, using per-province models: {e}")
+                    self._global_failed = version
+                    return None
+                shared = (version, model, forest)
+                self._global_model = shared
+        
+        metadata = self._global_meta[1]
+        provinces = metadata['provinces']
+        return ForecastModel(
+            shared[1],
+            metadata.get('metrics', {}).get(normalized, {}),
+            version,
+            forest=shared[2],
+            path=model_path,
+            province_index=provinces.index(normalized),
+            n_provinces=len(provinces)
+        )
+    
+    def _build_model(self, normalized: str) -> Optional[ForecastModel]:
+        version = self._global_version(normalized)
+        if version is not None:
+            entry = self._build_global(normalized, version)
+            if entry is not None:
+                return entry
+        
+        version = self._model_version(normalized)
+        if version is None:
+            return None
+        
+        model_path = MODEL_DIR / version[0]
+        
+        try:
+            model, forest = self._read_artifact(model_path)
             
             # Load metrics if available
+            metrics = {}
+            metrics_path = MODEL_DIR / f"metrics_{normalized}.json"
             if metrics_path.exists():
                 with open(metrics_path, 'r') as f:
-                    self._metrics[normalized] = json.load(f)
+                    metrics = json.load(f)
             
-            return model
+            return ForecastModel(model, metrics, version, forest=forest, path=model_path)
         except Exception as e:
-            print(f"Error loading model for {province}: {e}")
+            print(f"Error loading model for {normalized.replace('_', ' ')}: {e}")
+            return None
+    
+    def _province_lock(self, normalized: str) -> threading.Lock:
+        lock = self._locks.get(normalized)
+        if lock is None:
+            with self._lock:
+                lock = self._locks.setdefault(normalized, threading.Lock())
+        return lock
+    
+    def _load_model(self, province: str) -> Optional[ForecastModel]:
+        """Load model from disk if not already loaded (reloads happen via reload())."""
+        normalized = self._normalize_province(province)
+        entry = self._models.get(normalized)
+        if entry is not None:
+            return entry
+        
+        with self._province_lock(normalized):
+            entry = self._models.get(normalized)
+            if entry is None:
+                entry = self._build_model(normalized)
+                if entry is not None:
+                    self._models[normalized] = entry
+            return entry
+    
+    def artifact_state(self) -> Dict[str, Optional[tuple]]:
+        """On-disk model version token (see _model_version) for each loaded province."""
+        return {normalized: self._model_version(normalized) for normalized in list(self._models)}
+    
+    def loaded_state(self) -> Optional[Dict[str, Optional[tuple]]]:
+        """Model versions currently served, None if nothing is loaded."""
+        if not self._models:
             return None
+        return {normalized: entry.version for normalized, entry in list(self._models.items())}
+    
+    def reload(self) -> bool:
+        """
+        Reload every loaded province whose artifact changed on disk.
+        
+        New snapshots are built before they replace the old ones; removed
+        artifacts are dropped. Provinces that fail to load keep the old model.
+        
+        Returns:
+            True if every changed province was swapped (or dropped)
+        """
+        ok = True
+        for normalized in list(self._models):
+            with self._province_lock(normalized):
+                entry = self._models.get(normalized)
+                if entry is None:
+                    continue
+                version = self._model_version(normalized)
+                if version == entry.version:
+                    continue
+                if version is None:
+                    self._models.pop(normalized, None)
+                else:
+                    new_entry = self._build_model(normalized)
+                    if new_entry is None:
+                        ok = False
+                        continue
+                    self._models[normalized] = new_entry
+            # Cached predictions of the replaced version are unreachable (keys carry
+            # the version); drop them now instead of waiting for the TTL
+            self._invalidate_cache(normalized)
+        return ok
+    
+    def _invalidate_cache(self, normalized: str):
+        self._prediction_cache.invalidate(
+            lambda key: self._normalize_province(key[0]) == normalized
+        )
+    
+    def invalidate(self, province: Optional[str] = None):
+        """Forget loaded model(s) and their cached predictions."""
+        if province is None:
+            self._models.clear()
+            self._prediction_cache.invalidate()
+            return
+        
+        normalized = self._normalize_province(province)
+        self._models.pop(normalized, None)
+        self._invalidate_cache(normalized)
+    
+    def cache_stats(self) -> dict:
+        """Prediction cache counters for monitoring."""
+        return self._prediction_cache.stats()
     
     def get_model_info(self, province: str) -> Optional[dict]:
         """Get model metadata and metrics."""
-        normalized = self._normalize_province(province)
-        model = self._load_model(province)
+        entry = self._load_model(province)
         
-        if not model:
+        if entry is None:
             return None
         
         return {
             'province': province,
-            'model_path': str(MODEL_DIR / f"forecast_{normalized}.joblib"),
-            'metrics': self._metrics.get(normalized, {}),
+            'model_path': str(entry.path),
+            'format': 'flat' if entry.model is None else 'joblib',
+            'layout': 'global' if entry.province_index is not None else 'per_province',
+            'metrics': entry.metrics,
+            'version': entry.version,
             'loaded': True
         }
     
-    def list_available_models(self) -> list:
-        """List all available trained models."""
+    def available_provinces(self) -> List[str]:
+        """Provinces with a trained model artifact on disk (without loading them)."""
         if not MODEL_DIR.exists():
             return []
         
+        normalized = {
+            model_file.name[len('forecast_'):].split('.', 1)[0]
+            for pattern in ("forecast_*.joblib", "forecast_*.forest.npz")
+            for model_file in MODEL_DIR.glob(pattern)
+        }
+        meta = self._global_metadata()
+        if meta is not None and self._pick_artifact(GLOBAL_MODEL_NAME) is not None:
+            normalized.update(meta[1].get('provinces', []))
+        return [name.replace('_', ' ') for name in sorted(normalized)]
+    
+    def loaded_provinces(self) -> List[str]:
+        """Provinces whose model is currently loaded in memory."""
+        return [normalized.replace('_', ' ') for normalized in list(self._models)]
+    
+    def list_available_models(self) -> list:
+        """List all available trained models."""
         models = []
-        for model_file in MODEL_DIR.glob("forecast_*.joblib"):
-            province = model_file.stem.replace('forecast_', '').replace('_', ' ')
+        for province in self.available_provinces():
             info = self.get_model_info(province)
             if info:
                 models.append(info)
         
         return models
     
+    def _build_features(
+        self,
+        years: np.ndarray,
+        months: np.ndarray,
+        occupancy_rates: np.ndarray,
+        avg_stay_days: np.ndarray
+    ) -> np.ndarray:
+        """Build the feature matrix (same columns as training)."""
+        month_sin = np.sin(2 * np.pi * months / 12)
+        month_cos = np.cos(2 * np.pi * months / 12)
+        return np.column_stack([years, month_sin, month_cos, occupancy_rates, avg_stay_days])
+    
+    def _predict_matrix(self, entry: ForecastModel, X: np.ndarray) -> List[Dict]:
+        """Run the model on a feature matrix and build one result per row."""
+        # Predict and estimate confidence interval from the spread of tree outputs.
+        # All trees are evaluated in one stacked traversal instead of per-tree calls.
+        forest = entry.forest
+        if forest is not None:
+            tree_predictions = forest.predict_all(X)
+            predictions = tree_predictions.mean(axis=0)
+            std = np.std(tree_predictions, axis=0)
+            lower = np.maximum(0, predictions - 1.96 * std)
+            upper = predictions + 1.96 * std
+        else:
+            predictions = entry.model.predict(X)
+            # Fallback: use 20% margin
+            margin = predictions * 0.2
+            lower = np.maximum(0, predictions - margin)
+            upper = predictions + margin
+        
+        return [
+            {
+                'predicted_visitors': int(round(pred)),
+                'confidence_interval': {
+                    'lower': int(round(lo)),
+                    'upper': int(round(up))
+                }
+            }
+            for pred, lo, up in zip(predictions, lower, upper)
+        ]
+    
     def predict(
         self, 
         province: str, 
@@ -102,46 +425,65 @@ class ForecastService:
             dict with keys: predicted_visitors, confidence_interval (lower, upper)
             or None if model not available
         """
-        cache_key = (province, year, month, occupancy_rate, avg_stay_days)
-        if cache_key in self._prediction_cache:
-            return self._prediction_cache[cache_key]
-
-        model = self._load_model(province)
+        results = self.predict_batch(
+            province,
+            years=[year],
+            months=[month],
+            occupancy_rates=[occupancy_rate],
+            avg_stay_days=[avg_stay_days]
+        )
+        return results[0] if results else None
+    
+    def predict_batch(
+        self,
+        province: str,
+        years: List[int],
+        months: List[int],
+        occupancy_rates: Optional[List[float]] = None,
+        avg_stay_days: Optional[List[float]] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Predict visitors for many month/year rows of a single province.
+        
+        Rows not already cached are stacked into one feature matrix and
+        predicted (with confidence intervals) in a single model call.
+        
+        Returns:
+            list of prediction dicts in input order, or None if model not available
+        """
+        n = len(years)
+        if occupancy_rates is None:
+            occupancy_rates = [0.0] * n
+        if avg_stay_days is None:
+            avg_stay_days = [0.0] * n
         
-        if not model:
+        entry = self._load_model(province)
+        
+        if entry is None:
             return None
         
-        # Prepare features (same as training)
-        month_sin = np.sin(2 * np.pi * month / 12)
-        month_cos = np.cos(2 * np.pi * month / 12)
+        # Keys carry the model version so a retrained artifact never serves stale results
+        keys = [
+            (province, year, month, occ, stay, entry.version)
+            for year, month, occ, stay in zip(years, months, occupancy_rates, avg_stay_days)
+        ]
+        results = [self._prediction_cache.get(key) for key in keys]
+        missing = [i for i, res in enumerate(results) if res is None]
+        if not missing:
+            return results
         
-        X = np.array([[year, month_sin, month_cos, occupancy_rate, avg_stay_days]])
+        X = self._build_features(
+            np.array([years[i] for i in missing], dtype=float),
+            np.array([months[i] for i in missing], dtype=float),
+            np.array([occupancy_rates[i] for i in missing], dtype=float),
+            np.array([avg_stay_days[i] for i in missing], dtype=float)
+        )
         
-        # Predict
-        prediction = model.predict(X)[0]
+        for i, result in zip(missing, self._predict_matrix(entry, entry.encode(X))):
+            self._prediction_cache.set(keys[i], result)
+            results[i] = result
         
-        # Confidence interval estimation (simple approach using RF prediction variance)
-        # For RandomForest, we can use individual tree predictions
-        if hasattr(model, 'estimators_'):
-            tree_predictions = np.array([tree.predict(X)[0] for tree in model.estimators_])
-            std = np.std(tree_predictions)
-            lower = max(0, prediction - 1.96 * std)
-            upper = prediction + 1.96 * std
-        else:
-            # Fallback: use 20% margin
-            margin = prediction * 0.2
-            lower = max(0, prediction - margin)
-            upper = prediction + margin
-        
-        result = {
-            'predicted_visitors': int(round(prediction)),
-            'confidence_interval': {
-                'lower': int(round(lower)),
-                'upper': int(round(upper))
-            }
-        }
-        self._prediction_cache[cache_key] = result
-        return result
+        return results
 
 
 # Global singleton instance
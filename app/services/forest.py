@@ -0,0 +1,160 @@
+"""
+Flat Forest - Vectorized evaluation of tree ensembles.
+
+This module:
+- Flattens every tree of a fitted sklearn forest into shared node arrays
+- Traverses all trees for all samples in one stacked NumPy pass
+- Returns the per-tree outputs needed for mean prediction and CI estimation
+- Saves/loads the node arrays as a compact .npz artifact (no pickle, no sklearn)
+"""
+
+from pathlib import Path
+from typing import Optional, Union
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+
+def _float32_floor(threshold: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each float64 threshold.
+
+    Features are compared as float32, so for any float32 x:
+    x <= t  <=>  x <= floor32(t). Plain rounding could round up past x.
+    """
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class FlatForest:
+    """All trees of a regression forest packed into contiguous node arrays.
+
+    Node ``i`` of tree ``t`` lives at ``roots[t] + i``; child indices are
+    stored already offset, so a traversal only needs the global node id.
+    Leaves point to themselves, which lets every (tree, sample) pair step
+    down the same number of levels without per-path branching.
+    """
+
+    def __init__(
+        self,
+        roots: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        max_depth: int
+    ):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model) -> Optional["FlatForest"]:
+        """Build a flat forest from a fitted single-output regression forest."""
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators:
+            return None
+
+        roots, features, thresholds, lefts, rights, values = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                return None
+
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n_nodes, dtype=np.int32)
+
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            roots=np.asarray(roots, dtype=np.int32),
+            feature=np.concatenate(features),
+            threshold=_float32_floor(np.concatenate(thresholds)),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            max_depth=max_depth
+        )
+
+    def save(self, path: Union[str, Path]):
+        """Write the node arrays to an uncompressed .npz (loads with plain np.load)."""
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                format_version=np.int32(FORMAT_VERSION),
+                roots=self.roots,
+                feature=self.feature,
+                threshold=self.threshold,
+                left=self.left,
+                right=self.right,
+                value=self.value,
+                max_depth=np.int32(self.max_depth)
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "FlatForest":
+        """Read a forest written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported flat forest format version {version}")
+            return cls(
+                roots=data['roots'],
+                feature=data['feature'],
+                threshold=data['threshold'],
+                left=data['left'],
+                right=data['right'],
+                value=data['value'],
+                max_depth=int(data['max_depth'])
+            )
+
+    def predict_all(self, X: np.ndarray) -> np.ndarray:
+        """
+        Evaluate every tree on every sample.
+
+        Args:
+            X: feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            Array of shape (n_trees, n_samples) with each tree's output
+        """
+        # sklearn compares float32 features against float64 thresholds; the
+        # float32 thresholds are rounded down so split decisions stay identical.
+        X = np.asarray(X, dtype=np.float32)
+        n_samples = X.shape[0]
+
+        nodes = np.repeat(self.roots[:, None], n_samples, axis=1)
+        sample_idx = np.broadcast_to(np.arange(n_samples), nodes.shape)
+
+        for _ in range(self.max_depth):
+            go_left = X[sample_idx, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return self.value[nodes]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Mean prediction over trees (same as RandomForestRegressor.predict)."""
+        return self.predict_all(X).mean(axis=0)
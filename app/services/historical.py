@@ -0,0 +1,137 @@
+"""
+Historical Averages - In-memory province x month visitor averages.
+
+This module:
+- Loads AVG(domestic_visitors + foreign_visitors) per (province, month) in one query
+- Serves the forecast fallback path from memory, without a DB round trip
+- Refreshes periodically, reloading only when tourism_statistics changed
+  (inserts, deletes or updated figures)
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import TourismStatistics
+
+
+class HistoricalAverages:
+    """Singleton table of average monthly visitors per province."""
+
+    def __init__(self):
+        self._table: Optional[Dict[Tuple[str, int], int]] = None
+        self._signature: Optional[tuple] = None
+        self.loaded_at: Optional[str] = None
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._table is not None
+
+    def get(self, province: str, month: int) -> Optional[int]:
+        """Average visitors for province/month, None if unknown or not loaded."""
+        if self._table is None:
+            return None
+        return self._table.get((province, month))
+
+    async def _data_signature(self, session: AsyncSession) -> tuple:
+        """
+        Fingerprint of tourism_statistics used to skip unchanged reloads.
+
+        count/max(id)/max(created_at) catch inserts and deletes; the md5 over
+        the averaged columns catches UPDATEs of existing rows.
+        """
+        stats = TourismStatistics
+        row_text = func.concat_ws(
+            '|',
+            stats.id,
+            stats.province,
+            stats.month,
+            func.coalesce(stats.domestic_visitors, -1),
+            func.coalesce(stats.foreign_visitors, -1)
+        )
+        result = await session.execute(
+            select(
+                func.count(stats.id),
+                func.max(stats.id),
+                func.max(stats.created_at),
+                func.md5(func.string_agg(row_text, aggregate_order_by(literal_column("';'"), stats.id)))
+            )
+        )
+        return tuple(result.one())
+
+    async def refresh(self, session: AsyncSession, force: bool = False) -> bool:
+        """
+        Reload the table if tourism_statistics changed since the last load.
+
+        Returns:
+            True if the table was (re)loaded
+        """
+        self.checks += 1
+        try:
+            signature = await self._data_signature(session)
+            if not force and self._table is not None and signature == self._signature:
+                return False
+
+            result = await session.execute(
+                select(
+                    TourismStatistics.province,
+                    TourismStatistics.month,
+                    func.avg(
+                        TourismStatistics.domestic_visitors + TourismStatistics.foreign_visitors
+                    ).label("avg_visitors")
+                ).group_by(TourismStatistics.province, TourismStatistics.month)
+            )
+            table = {
+                (row.province, row.month): int(row.avg_visitors)
+                for row in result
+                if row.avg_visitors is not None
+            }
+        except Exception as e:
+            self.failures += 1
+            print(f"Error refreshing historical averages: {e}")
+            return False
+
+        # Single assignment: readers see either the old or the new table
+        self._table = table
+        self._signature = signature
+        self.loaded_at = datetime.utcnow().isoformat()
+        self.reloads += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            'loaded': self.loaded,
+            'entries': len(self._table) if self._table is not None else 0,
+            'loaded_at': self.loaded_at,
+            'checks': self.checks,
+            'reloads': self.reloads,
+            'failures': self.failures
+        }
+
+
+_historical_averages = HistoricalAverages()
+
+
+def get_historical_averages() -> HistoricalAverages:
+    """Get the singleton historical averages table."""
+    return _historical_averages
+
+
+async def historical_refresh_loop(interval_seconds: float):
+    """Load the table now, then re-check every interval (0 = load once)."""
+    from app.db import async_session
+
+    table = get_historical_averages()
+    while True:
+        async with async_session() as session:
+            await table.refresh(session)
+        if interval_seconds <= 0:
+            return
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,601 @@
+"""
+Job Runner - Execute ML pipelines behind /ml/jobs.
+
+This module:
+- Persists jobs and their logs in a local SQLite store (survives restarts,
+  shared by every worker process on the host)
+- Runs each pipeline script in its own subprocess, streaming stdout into the job log
+- Derives progress from "[i/n]" lines printed by the scripts
+- Limits concurrently running jobs per type (enforced in the shared store)
+- Cancels by terminating the subprocess, also when requested from another worker
+- Keeps SQLite off the event loop: store calls run in worker threads and
+  subprocess output is written in batches
+- Workers heartbeat into the store under a per-process owner token; jobs of an
+  owner whose heartbeat went stale are recovered by the surviving workers
+  (PIDs are reused across restarts, e.g. uvicorn is PID 1 in the container)
+"""
+
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Job type -> script run in a subprocess (types without a pipeline finish immediately)
+PIPELINES = {
+    'retrain': 'scripts/train_forecast_baseline.py',
+    'evaluate': 'scripts/evaluate_models.py',
+}
+
+JOB_TYPES = ['retrain', 'inference', 'export', 'evaluate', 'sync']
+
+_PROGRESS_RE = re.compile(r'^\s*\[(\d+)/(\d+)\]')
+
+# Subprocess output is buffered and written to the store at most this often
+LOG_FLUSH_SECONDS = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    result_url TEXT,
+    payload TEXT,
+    owner TEXT,
+    pgid INTEGER,
+    host TEXT,
+    proc_start INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_type_status ON jobs (type, status);
+CREATE TABLE IF NOT EXISTS job_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_logs_job ON job_logs (job_id, id);
+CREATE TABLE IF NOT EXISTS workers (
+    owner TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+
+def _pipeline_env() -> Dict[str, str]:
+    """Environment for pipeline scripts.
+
+    Settings read from .env never reach os.environ, and the scripts only look
+    at their environment, so the values they need are passed explicitly.
+    """
+    return {
+        **os.environ,
+        'DATABASE_URL': settings.DATABASE_URL,
+        'TRAIN_WORKERS': str(settings.TRAIN_WORKERS),
+        'TRAIN_THREADS_PER_MODEL': str(settings.TRAIN_THREADS_PER_MODEL),
+    }
+
+
+def _process_start(pid: Optional[int]) -> Optional[int]:
+    """Start time of a process (clock ticks since boot, from /proc), None if gone or unknown.
+
+    Compared with the value recorded at spawn time, it tells a still-running
+    pipeline apart from an unrelated process that reused its PID.
+    """
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+        # Field 2 (comm) may contain spaces: fields 3.. follow the last ')'
+        return int(stat.rsplit(')', 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobStore:
+    """SQLite-backed job table; every call opens a short transaction."""
+
+    def __init__(self, path: str, log_limit: int = 200):
+        self.path = Path(path)
+        if not self.path.is_absolute():
+            self.path = PROJECT_ROOT / self.path
+        self.log_limit = log_limit
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit: each statement is its own transaction unless BEGIN is explicit
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _to_dict(self, conn: sqlite3.Connection, row: sqlite3.Row) -> dict:
+        logs = conn.execute(
+            "SELECT line FROM (SELECT id, line FROM job_logs WHERE job_id = ? "
+            "ORDER BY id DESC LIMIT ?) ORDER BY id",
+            (row['id'], self.log_limit)
+        ).fetchall()
+        return {
+            'id': row['id'],
+            'type': row['type'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'result_url': row['result_url'],
+            'logs': [log['line'] for log in logs],
+            'payload': json.loads(row['payload']) if row['payload'] else {},
+            'cancel_requested': bool(row['cancel_requested']),
+        }
+
+    def create(self, job_type: str, payload: Optional[dict], owner: str) -> dict:
+        job_id = str(uuid.uuid4())
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, type, status, created_at, payload, owner) "
+                "VALUES (?, ?, 'pending', ?, ?, ?)",
+                (job_id, job_type, now, json.dumps(payload or {}), owner)
+            )
+            conn.executemany(
+                "INSERT INTO job_logs (job_id, line) VALUES (?, ?)",
+                [(job_id, f"[{now}] Job {job_type} criado"),
+                 (job_id, f"[{now}] Aguardando execução...")]
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._to_dict(conn, row) if row else None
+
+    def list(self, limit: int = 100) -> List[dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [self._to_dict(conn, row) for row in rows]
+
+    def log(self, job_id: str, message: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO job_logs (job_id, line) VALUES (?, ?)",
+                (job_id, f"[{_now()}] {message}")
+            )
+
+    def append_output(self, job_id: str, lines: List[tuple], progress: Optional[int] = None):
+        """Append (timestamp, line) pairs and optionally update progress, in one transaction."""
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO job_logs (job_id, line) VALUES (?, ?)",
+                    [(job_id, f"[{timestamp}] {line}") for timestamp, line in lines]
+                )
+                if progress is not None:
+                    conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def finish(self, job_id: str, status: str, message: str, result_url: Optional[str] = None):
+        """Move an active job to a terminal status (no-op if already terminal)."""
+        now = _now()
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result_url = ?, "
+                "progress = CASE WHEN ? = 'finished' THEN 100 ELSE progress END "
+                "WHERE id = ? AND status IN ('pending', 'running')",
+                (status, now, result_url, status, job_id)
+            ).rowcount
+            if updated:
+                conn.execute(
+                    "INSERT INTO job_logs (job_id, line) VALUES (?, ?)",
+                    (job_id, f"[{now}] {message}")
+                )
+
+    def try_claim(self, job_id: str, job_type: str, limit: int) -> bool:
+        """Atomically move a pending job to running if its type is under the limit."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                running = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE type = ? AND status = 'running'",
+                    (job_type,)
+                ).fetchone()[0]
+                claimed = running < limit and conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ? "
+                    "WHERE id = ? AND status = 'pending'",
+                    (_now(), job_id)
+                ).rowcount == 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def request_cancel(self, job_id: str) -> Optional[dict]:
+        """Flag a job for cancellation; pending jobs are cancelled right away."""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+        self._cancel_if_pending(job_id)
+        return self.get(job_id)
+
+    def _cancel_if_pending(self, job_id: str):
+        now = _now()
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'pending' AND cancel_requested = 1",
+                (now, job_id)
+            ).rowcount
+            if updated:
+                conn.execute(
+                    "INSERT INTO job_logs (job_id, line) VALUES (?, ?)",
+                    (job_id, f"[{now}] Job cancelado pelo utilizador")
+                )
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def set_process(self, job_id: str, pgid: int, host: str, proc_start: Optional[int]):
+        """Record the pipeline's process group so a recovering worker can stop it."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET pgid = ?, host = ?, proc_start = ? WHERE id = ?",
+                (pgid, host, proc_start, job_id)
+            )
+
+    def heartbeat(self, owner: str, pid: int, forget_after: float):
+        """Record that `owner` is alive; forget owners silent for longer than forget_after."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO workers (owner, pid, heartbeat_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(owner) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (owner, pid, now)
+            )
+            conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (now - forget_after,))
+
+    def remove_worker(self, owner: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workers WHERE owner = ?", (owner,))
+
+    def orphaned(self, stale_after: float) -> List[sqlite3.Row]:
+        """Active jobs whose owner has not sent a heartbeat within stale_after seconds."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT j.id, j.type, j.status, j.owner, j.pgid, j.host, j.proc_start FROM jobs j "
+                "LEFT JOIN workers w ON w.owner = j.owner "
+                "WHERE j.status IN ('pending', 'running') "
+                "AND (w.heartbeat_at IS NULL OR w.heartbeat_at < ?)",
+                (time.time() - stale_after,)
+            ).fetchall()
+
+    def adopt(self, job_id: str, previous_owner: Optional[str], owner: str) -> bool:
+        """Take over an orphaned job; False if another worker adopted it first."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET owner = ? WHERE id = ? AND owner IS ?",
+                (owner, job_id, previous_owner)
+            ).rowcount == 1
+
+
+class JobRunner:
+    """Schedules jobs of this worker process and supervises their subprocesses."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        limits: Optional[Dict[str, int]] = None,
+        poll_seconds: float = 1.0,
+        timeout_seconds: float = 3600.0,
+        heartbeat_seconds: float = 5.0
+    ):
+        self.store = store
+        self.limits = limits or {}
+        self.poll_seconds = poll_seconds
+        self.timeout_seconds = timeout_seconds if timeout_seconds > 0 else None
+        self.heartbeat_seconds = max(0.1, heartbeat_seconds)
+        # Unique per process start, unlike the PID
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._procs: Dict[str, asyncio.subprocess.Process] = {}
+        self._supervisor: Optional[asyncio.Task] = None
+
+    def limit(self, job_type: str) -> int:
+        return max(1, self.limits.get(job_type, 1))
+
+    @property
+    def stale_after(self) -> float:
+        return self.heartbeat_seconds * 6
+
+    def start(self):
+        """Start heartbeating and recovering jobs left behind by workers that exited."""
+        if self._supervisor is None or self._supervisor.done():
+            self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _supervise(self):
+        while True:
+            try:
+                await asyncio.to_thread(
+                    self.store.heartbeat, self.owner, os.getpid(), self.stale_after * 10
+                )
+                await self._recover_orphans()
+            except Exception as e:
+                print(f"Error supervising ML jobs: {e}")
+            await asyncio.sleep(self.heartbeat_seconds)
+
+    async def _recover_orphans(self):
+        for row in await asyncio.to_thread(self.store.orphaned, self.stale_after):
+            adopted = await asyncio.to_thread(self.store.adopt, row['id'], row['owner'], self.owner)
+            if not adopted:
+                continue
+            if row['status'] == 'running':
+                # Stays 'running' (holding its concurrency slot) until the old pipeline is gone
+                self._track(row['id'], self._stop_orphan(row))
+            else:
+                await asyncio.to_thread(self.store.log, row['id'], "Job retomado após reinício do serviço")
+                self._schedule(row['id'], row['type'])
+
+    async def _stop_orphan(self, row: sqlite3.Row, grace_seconds: float = 5.0):
+        """Terminate the pipeline left running by a dead worker, then fail its job.
+
+        The script runs in its own session, so it outlives the worker that
+        started it; left alone it would race a new retrain writing models/.
+        """
+        def alive() -> bool:
+            return (
+                row['host'] == socket.gethostname()
+                and row['proc_start'] is not None
+                and _process_start(row['pgid']) == row['proc_start']
+            )
+
+        message = "Job interrompido: o processo que o executava terminou"
+        if alive():
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + grace_seconds
+            try:
+                os.killpg(row['pgid'], signal.SIGTERM)
+                while alive() and loop.time() < deadline:
+                    await asyncio.sleep(0.2)
+                if alive():
+                    os.killpg(row['pgid'], signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            message += "; pipeline órfão terminado"
+
+        await asyncio.to_thread(self.store.finish, row['id'], 'failed', message)
+
+    async def submit(self, job_type: str, payload: Optional[dict] = None) -> dict:
+        job = await asyncio.to_thread(self.store.create, job_type, payload, self.owner)
+        self._schedule(job['id'], job_type)
+        return job
+
+    def _schedule(self, job_id: str, job_type: str):
+        self._track(job_id, self._run(job_id, job_type))
+
+    def _track(self, job_id: str, coro):
+        task = asyncio.create_task(coro)
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def list(self, limit: int = 100) -> List[dict]:
+        return await asyncio.to_thread(self.store.list, limit)
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        job = await asyncio.to_thread(self.store.request_cancel, job_id)
+        proc = self._procs.get(job_id)
+        if proc is not None:
+            self._terminate(proc)
+        return job
+
+    async def _run(self, job_id: str, job_type: str):
+        script = PIPELINES.get(job_type)
+        if script is None:
+            await asyncio.to_thread(
+                self.store.finish, job_id, 'finished', f"Job {job_type} concluído (sem pipeline associado)"
+            )
+            return
+
+        # Wait for a free slot for this job type (limit shared by all workers)
+        while not await asyncio.to_thread(self.store.try_claim, job_id, job_type, self.limit(job_type)):
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job is None or job['status'] != 'pending':
+                return
+            await asyncio.sleep(self.poll_seconds)
+
+        try:
+            await self._execute(job_id, job_type, script)
+        except Exception as e:
+            print(f"Error running job {job_id} ({job_type}): {e}")
+            await asyncio.to_thread(self.store.finish, job_id, 'failed', f"Erro ao executar o job: {e}")
+
+    async def _execute(self, job_id: str, job_type: str, script: str):
+        await asyncio.to_thread(self.store.log, job_id, f"A executar {script}")
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, '-u', script,
+            cwd=str(PROJECT_ROOT),
+            env=_pipeline_env(),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True
+        )
+        self._procs[job_id] = proc
+        try:
+            await asyncio.to_thread(
+                self.store.set_process, job_id, proc.pid, socket.gethostname(), _process_start(proc.pid)
+            )
+        except Exception as e:
+            print(f"Error recording the process of job {job_id}: {e}")
+        watcher = asyncio.create_task(self._watch_cancel(job_id, proc))
+        timed_out = False
+        try:
+            try:
+                await asyncio.wait_for(self._stream_output(job_id, proc), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                timed_out = True
+                self._terminate(proc)
+            returncode = await proc.wait()
+        finally:
+            watcher.cancel()
+            self._procs.pop(job_id, None)
+
+        if await asyncio.to_thread(self.store.cancel_requested, job_id):
+            status, message = 'cancelled', "Job cancelado pelo utilizador"
+        elif timed_out:
+            status, message = 'failed', f"Job excedeu o tempo limite de {self.timeout_seconds:.0f}s"
+        elif returncode == 0:
+            status, message = 'finished', f"Job {job_type} concluído com sucesso"
+        else:
+            status, message = 'failed', f"Job {job_type} falhou (código de saída {returncode})"
+        await asyncio.to_thread(self.store.finish, job_id, status, message)
+
+    async def _stream_output(self, job_id: str, proc: asyncio.subprocess.Process):
+        """Read the script's stdout; a flusher task writes it to the store in batches."""
+        buffer = {'lines': [], 'progress': None}
+        done = asyncio.Event()
+        flusher = asyncio.create_task(self._flush_output(job_id, buffer, done))
+        try:
+            async for raw in proc.stdout:
+                line = raw.decode(errors='replace').rstrip()
+                if not line:
+                    continue
+                buffer['lines'].append((_now(), line))
+                match = _PROGRESS_RE.match(line)
+                if match:
+                    done_steps, total = int(match.group(1)), int(match.group(2))
+                    if total:
+                        # 100 is reserved for a clean exit
+                        buffer['progress'] = min(99, done_steps * 100 // total)
+        finally:
+            # The flusher writes what is left, also when the timeout cancelled us
+            done.set()
+            await asyncio.shield(flusher)
+
+    async def _flush_output(self, job_id: str, buffer: dict, done: asyncio.Event):
+        while True:
+            try:
+                await asyncio.wait_for(done.wait(), LOG_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            lines, buffer['lines'] = buffer['lines'], []
+            progress, buffer['progress'] = buffer['progress'], None
+            if lines or progress is not None:
+                try:
+                    await asyncio.to_thread(self.store.append_output, job_id, lines, progress)
+                except Exception as e:
+                    print(f"Error writing output of job {job_id}: {e}")
+            if done.is_set():
+                return
+
+    async def _watch_cancel(self, job_id: str, proc: asyncio.subprocess.Process):
+        """Pick up cancellations requested through another worker process."""
+        while proc.returncode is None:
+            await asyncio.sleep(self.poll_seconds)
+            if await asyncio.to_thread(self.store.cancel_requested, job_id):
+                self._terminate(proc)
+                return
+
+    def _terminate(self, proc: asyncio.subprocess.Process, grace_seconds: float = 5.0):
+        """SIGTERM the script's process group, SIGKILL it if still alive after the grace period."""
+        if proc.returncode is not None:
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+
+        def _kill():
+            if proc.returncode is None:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+        asyncio.get_running_loop().call_later(grace_seconds, _kill)
+
+    async def shutdown(self):
+        """Stop this worker's subprocesses; their jobs are marked failed."""
+        for job_id, proc in list(self._procs.items()):
+            self._terminate(proc, grace_seconds=0)
+            await asyncio.to_thread(self.store.finish, job_id, 'failed', "Job interrompido: serviço encerrado")
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        # Pending jobs of this worker are picked up by the others without waiting
+        await asyncio.to_thread(self.store.remove_worker, self.owner)
+
+    def stats(self) -> dict:
+        return {
+            'running_here': sorted(self._procs),
+            'scheduled_here': len(self._tasks),
+            'limits': {job_type: self.limit(job_type) for job_type in PIPELINES},
+        }
+
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    """"retrain=1,evaluate=2" -> {'retrain': 1, 'evaluate': 2}"""
+    limits = {}
+    for item in value.split(','):
+        name, _, count = item.partition('=')
+        if name.strip() and count.strip():
+            limits[name.strip()] = int(count)
+    return limits
+
+
+_job_runner: Optional[JobRunner] = None
+
+
+def get_job_runner() -> JobRunner:
+    """Get the singleton job runner (the SQLite store is opened on first use)."""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = JobRunner(
+            JobStore(settings.JOBS_DB_PATH, log_limit=settings.JOBS_LOG_LINES),
+            limits=_parse_limits(settings.JOBS_CONCURRENCY),
+            poll_seconds=settings.JOBS_POLL_SECONDS,
+            timeout_seconds=settings.JOBS_TIMEOUT_SECONDS,
+            heartbeat_seconds=settings.JOBS_HEARTBEAT_SECONDS
+        )
+    return _job_runner
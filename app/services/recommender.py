@@ -3,6 +3,9 @@ Recommender Service - Load and use trained recommendation model.
 
 This module:
 - Loads content-based recommendation model from disk
+- Serves similarities from a dense matrix, a top-K neighbor table or
+  on demand from normalized features, depending on the model metadata
+- Memory-maps the matrices read-only so worker processes share one page-cache copy
 - Provides similar destination recommendations
 - Provides personalized recommendations based on user preferences
 """
@@ -13,75 +16,255 @@ from typing import Optional, List, Dict
 import numpy as np
 import joblib
 
+from app.core.config import settings
+from app.services.registry import SnapshotService
+
 
 MODEL_DIR = Path("models")
 
 
-class RecommenderService:
-    """Singleton service to manage recommendation model."""
+class DestinationCatalog:
+    """Destination attributes as compact NumPy columns for vectorized filtering.
+    
+    Categories and provinces are dictionary-encoded; a boolean mask per
+    distinct value is precomputed so a preference filter is a few ORs/ANDs.
+    """
+    
+    def __init__(self, destinations: List[Dict]):
+        n = len(destinations)
+        categories = [dest.get('category', dest.get('category_id')) for dest in destinations]
+        provinces = [dest['province'] for dest in destinations]
+        
+        self.category_values = list(dict.fromkeys(categories))
+        self.province_values = list(dict.fromkeys(provinces))
+        category_codes = {value: code for code, value in enumerate(self.category_values)}
+        province_codes = {value: code for code, value in enumerate(self.province_values)}
+        
+        self.category_codes = np.array([category_codes[c] for c in categories], dtype=np.int32)
+        self.province_codes = np.array([province_codes[p] for p in provinces], dtype=np.int32)
+        self.ratings = np.array(
+            [dest.get('rating', dest.get('rating_avg', 0)) or 0 for dest in destinations],
+            dtype=np.float32
+        )
+        
+        self.category_masks = {
+            value: self.category_codes == code for value, code in category_codes.items()
+        }
+        self.province_masks = {
+            value: self.province_codes == code for value, code in province_codes.items()
+        }
+        self._empty = np.zeros(n, dtype=bool)
+    
+    def __len__(self) -> int:
+        return len(self.ratings)
+    
+    def _any_of(self, masks: Dict[str, np.ndarray], values: List[str]) -> np.ndarray:
+        selected = [masks[value] for value in values if value in masks]
+        if not selected:
+            return self._empty
+        return np.logical_or.reduce(selected)
+    
+    def filter(
+        self,
+        categories: Optional[List[str]] = None,
+        provinces: Optional[List[str]] = None,
+        min_rating: Optional[float] = None
+    ) -> np.ndarray:
+        """Boolean mask of destinations matching all given preferences."""
+        mask = np.ones(len(self), dtype=bool)
+        if categories:
+            mask &= self._any_of(self.category_masks, categories)
+        if provinces:
+            mask &= self._any_of(self.province_masks, provinces)
+        if min_rating:
+            mask &= self.ratings >= np.float32(min_rating)
+        return mask
+    
+    def top_by_rating(self, mask: np.ndarray, n: int) -> np.ndarray:
+        """
+        Indices of the n best-rated destinations in mask, rating descending.
+        
+        Ties keep catalog order, matching a stable sort over the filtered list.
+        """
+        candidates = np.flatnonzero(mask)
+        if n <= 0 or len(candidates) == 0:
+            return candidates[:0]
+        
+        ratings = self.ratings[candidates]
+        if len(candidates) > n:
+            # Keep everything strictly above the n-th best rating, then fill
+            # the remaining slots with ties in catalog order
+            kth = -np.partition(-ratings, n - 1)[n - 1]
+            above = ratings > kth
+            ties = np.flatnonzero(ratings == kth)[:n - int(above.sum())]
+            keep = np.concatenate([np.flatnonzero(above), ties])
+            candidates, ratings = candidates[keep], ratings[keep]
+        
+        order = np.lexsort((candidates, -ratings))
+        return candidates[order]
+
+
+class RecommenderModel:
+    """One loaded version of the recommender artifacts (immutable once built)."""
+    
+    def __init__(self, metadata: dict, state: Dict[str, Optional[int]]):
+        self.metadata = metadata
+        self.state = state
+        self.version = str(state['metadata'])
+        self.similarity_mode: str = 'dense'
+        self.similarity_matrix: Optional[np.ndarray] = None
+        self.normalized_features: Optional[np.ndarray] = None
+        self.neighbor_idx: Optional[np.ndarray] = None
+        self.neighbor_scores: Optional[np.ndarray] = None
+        self.features: Optional[np.ndarray] = None
+        self.tfidf: Optional[any] = None
+        self.scaler: Optional[any] = None
+        
+        # Destination id <-> matrix row lookups
+        self.destinations: List[Dict] = metadata.get('destinations', [])
+        self.index_to_id: List[str] = [dest['id'] for dest in self.destinations]
+        self.id_to_index: Dict[str, int] = {dest_id: idx for idx, dest_id in enumerate(self.index_to_id)}
+        self.catalog = DestinationCatalog(self.destinations)
+    
+    def similarity_rows(self, source_indices: np.ndarray) -> np.ndarray:
+        """Full similarity rows (float64 copy) for the given source destinations."""
+        if self.similarity_matrix is not None:
+            return np.array(self.similarity_matrix[source_indices], dtype=np.float64)
+        
+        # Cosine similarity on L2-normalized features is a dot product
+        return (self.normalized_features[source_indices] @ self.normalized_features.T).astype(np.float64)
+    
+    def pair_similarity(self, source_idx: int, target_indices: np.ndarray) -> np.ndarray:
+        """Similarity between one source destination and selected targets."""
+        if self.similarity_matrix is not None:
+            return np.asarray(self.similarity_matrix[source_idx][target_indices], dtype=np.float64)
+        
+        return (self.normalized_features[target_indices] @ self.normalized_features[source_idx]).astype(np.float64)
     
-    def __init__(self):
-        self._similarity_matrix: Optional[np.ndarray] = None
-        self._features: Optional[np.ndarray] = None
-        self._tfidf: Optional[any] = None
-        self._scaler: Optional[any] = None
-        self._metadata: Optional[dict] = None
-        self._loaded = False
-        
-    def _load_model(self):
-        """Load model from disk if not already loaded."""
-        if self._loaded:
-            return
-        
-        sim_path = MODEL_DIR / "recommender_similarity_matrix.npy"
-        features_path = MODEL_DIR / "recommender_features.npy"
-        tfidf_path = MODEL_DIR / "recommender_tfidf.joblib"
-        scaler_path = MODEL_DIR / "recommender_scaler.joblib"
-        metadata_path = MODEL_DIR / "recommender_metadata.json"
-        
-        if not sim_path.exists() or not metadata_path.exists():
+    def top_k_similar(self, source_indices: np.ndarray, k: int) -> tuple:
+        """
+        Top-k most similar destinations for each source row, excluding itself.
+        
+        With a top-K neighbor table this is a slice; otherwise it uses
+        argpartition (O(N)) and only sorts the k selected columns.
+        
+        Returns:
+            (indices, scores) arrays of shape (len(source_indices), k), best first
+        """
+        if self.neighbor_idx is not None:
+            k = min(k, self.neighbor_idx.shape[1])
+            return (
+                np.asarray(self.neighbor_idx[source_indices, :k], dtype=np.intp),
+                np.asarray(self.neighbor_scores[source_indices, :k], dtype=np.float64)
+            )
+        
+        sim_rows = self.similarity_rows(source_indices)
+        n_rows, n_cols = sim_rows.shape
+        k = min(k, n_cols - 1)
+        if k <= 0:
+            empty = np.empty((n_rows, 0))
+            return empty.astype(np.intp), empty
+        
+        # Mask self so it can never be selected
+        sim_rows[np.arange(n_rows), source_indices] = -np.inf
+        
+        top = np.argpartition(sim_rows, n_cols - k, axis=1)[:, n_cols - k:]
+        top_scores = np.take_along_axis(sim_rows, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+    
+    def similar_destination(self, idx: int, score: float) -> Dict:
+        dest = self.destinations[idx]
+        return {
+            'destination_id': dest['id'],
+            'name': dest['name'],
+            'province': dest['province'],
+            'category': dest.get('category', dest.get('category_id')),
+            'rating': dest.get('rating', dest.get('rating_avg')),
+            'similarity_score': float(score)
+        }
+
+
+class RecommenderService(SnapshotService):
+    """Singleton service to manage recommendation model.
+    
+    The loaded artifacts live in one RecommenderModel snapshot; a reload builds
+    a new snapshot and swaps the reference, so requests never see a mix.
+    """
+    
+    def _artifact_paths(self) -> Dict[str, Path]:
+        return {
+            'similarity': MODEL_DIR / "recommender_similarity_matrix.npy",
+            'normalized': MODEL_DIR / "recommender_features_normalized.npy",
+            'neighbors_idx': MODEL_DIR / "recommender_neighbors_idx.npy",
+            'neighbors_scores': MODEL_DIR / "recommender_neighbors_scores.npy",
+            'features': MODEL_DIR / "recommender_features.npy",
+            'tfidf': MODEL_DIR / "recommender_tfidf.joblib",
+            'scaler': MODEL_DIR / "recommender_scaler.joblib",
+            'metadata': MODEL_DIR / "recommender_metadata.json",
+        }
+    
+    def _build_snapshot(self, state: Dict[str, Optional[int]]) -> Optional[RecommenderModel]:
+        paths = self._artifact_paths()
+        
+        if not paths['metadata'].exists():
             print("Recommendation model not found. Run train_recommender.py first.")
-            return
+            return None
         
         try:
-            self._similarity_matrix = np.load(sim_path)
-            self._features = np.load(features_path)
-            self._tfidf = joblib.load(tfidf_path)
-            self._scaler = joblib.load(scaler_path)
+            with open(paths['metadata'], 'r') as f:
+                metadata = json.load(f)
+            
+            # Older artifacts have no similarity_mode and always ship a dense matrix
+            mode = metadata.get('similarity_mode', 'dense')
+            required = {
+                'dense': ['similarity'],
+                'topk': ['normalized', 'neighbors_idx', 'neighbors_scores'],
+                'ondemand': ['normalized'],
+            }.get(mode)
+            if required is None or not all(paths[name].exists() for name in required):
+                print(f"Recommendation model artifacts for mode '{mode}' not found. Run train_recommender.py first.")
+                return None
             
-            with open(metadata_path, 'r') as f:
-                self._metadata = json.load(f)
+            # Read-only memory maps are shared between uvicorn workers via the page cache
+            mmap_mode = 'r' if settings.RECOMMENDER_MMAP else None
             
-            self._loaded = True
+            snapshot = RecommenderModel(metadata, state)
+            snapshot.similarity_mode = mode
+            if mode == 'dense':
+                snapshot.similarity_matrix = np.load(paths['similarity'], mmap_mode=mmap_mode)
+            else:
+                snapshot.normalized_features = np.load(paths['normalized'], mmap_mode=mmap_mode)
+            if mode == 'topk':
+                snapshot.neighbor_idx = np.load(paths['neighbors_idx'], mmap_mode=mmap_mode)
+                snapshot.neighbor_scores = np.load(paths['neighbors_scores'], mmap_mode=mmap_mode)
+            
+            snapshot.features = np.load(paths['features'], mmap_mode=mmap_mode)
+            snapshot.tfidf = joblib.load(paths['tfidf'])
+            snapshot.scaler = joblib.load(paths['scaler'])
+            return snapshot
         except Exception as e:
             print(f"Error loading recommendation model: {e}")
+            return None
     
     def get_model_info(self) -> Optional[Dict]:
         """Get recommendation model metadata."""
-        self._load_model()
+        snapshot = self._load_model()
         
-        if not self._loaded or not self._metadata:
+        if snapshot is None:
             return None
         
         return {
-            'n_destinations': self._metadata.get('n_destinations'),
-            'feature_dim': self._metadata.get('feature_dim'),
-            'categories': self._metadata.get('categories'),
-            'provinces': self._metadata.get('provinces'),
+            'n_destinations': snapshot.metadata.get('n_destinations'),
+            'feature_dim': snapshot.metadata.get('feature_dim'),
+            'categories': snapshot.metadata.get('categories'),
+            'provinces': snapshot.metadata.get('provinces'),
+            'similarity_mode': snapshot.similarity_mode,
+            'version': snapshot.version,
             'loaded': True
         }
     
-    def _get_destination_index(self, destination_id: str) -> Optional[int]:
-        """Get array index for a destination ID."""
-        if not self._metadata:
-            return None
-        
-        destinations = self._metadata.get('destinations', [])
-        for idx, dest in enumerate(destinations):
-            if dest['id'] == destination_id:
-                return idx
-        return None
-    
     def recommend_similar(
         self,
         destination_id: str,
@@ -97,43 +280,50 @@ class RecommenderService:
         Returns:
             List of recommended destinations with similarity scores
         """
-        self._load_model()
-        
-        if not self._loaded or self._similarity_matrix is None:
+        results = self.recommend_similar_batch([destination_id], n_recommendations)
+        if results is None:
             return None
+        return results[0]
+    
+    def recommend_similar_batch(
+        self,
+        destination_ids: List[str],
+        n_recommendations: int = 10
+    ) -> Optional[List[Optional[List[Dict]]]]:
+        """
+        Recommend similar destinations for many source destinations at once.
+        
+        Args:
+            destination_ids: UUIDs of the source destinations
+            n_recommendations: number of recommendations per source
+            
+        Returns:
+            One list of recommendations per source (None for unknown ids),
+            in input order; None if the model is not available
+        """
+        snapshot = self._load_model()
         
-        # Get index of the destination
-        dest_idx = self._get_destination_index(destination_id)
-        if dest_idx is None:
+        if snapshot is None:
             return None
         
-        # Get similarity scores
-        sim_scores = self._similarity_matrix[dest_idx]
+        source = [snapshot.id_to_index.get(dest_id) for dest_id in destination_ids]
+        known = [i for i, idx in enumerate(source) if idx is not None]
         
-        # Sort by similarity (excluding self)
-        similar_indices = np.argsort(sim_scores)[::-1]
-        similar_indices = [idx for idx in similar_indices if idx != dest_idx]
+        results: List[Optional[List[Dict]]] = [None] * len(destination_ids)
+        if not known:
+            return results
         
-        # Get top N
-        top_indices = similar_indices[:n_recommendations]
+        top_indices, top_scores = snapshot.top_k_similar(
+            np.array([source[i] for i in known]), n_recommendations
+        )
         
-        # Build recommendations
-        recommendations = []
-        destinations = self._metadata.get('destinations', [])
-        
-        for idx in top_indices:
-            if idx < len(destinations):
-                dest = destinations[idx]
-                recommendations.append({
-                    'destination_id': dest['id'],
-                    'name': dest['name'],
-                    'province': dest['province'],
-                    'category': dest.get('category', dest.get('category_id')),
-                    'rating': dest.get('rating', dest.get('rating_avg')),
-                    'similarity_score': float(sim_scores[idx])
-                })
+        for row, i in enumerate(known):
+            results[i] = [
+                snapshot.similar_destination(int(idx), score)
+                for idx, score in zip(top_indices[row], top_scores[row])
+            ]
         
-        return recommendations
+        return results
     
     def recommend_by_preferences(
         self,
@@ -154,37 +344,18 @@ class RecommenderService:
         Returns:
             List of recommended destinations with scores
         """
-        self._load_model()
+        snapshot = self._load_model()
         
-        if not self._loaded or not self._metadata:
+        if snapshot is None:
             return None
         
-        destinations = self._metadata.get('destinations', [])
+        destinations = snapshot.destinations
         
-        # Filter by preferences
-        filtered = []
-        for dest in destinations:
-            # Check category (support both old and new field names)
-            dest_category = dest.get('category', dest.get('category_id'))
-            if categories and dest_category not in categories:
-                continue
-            
-            # Check province
-            if provinces and dest['province'] not in provinces:
-                continue
-            
-            # Check rating (support both old and new field names)
-            dest_rating = dest.get('rating', dest.get('rating_avg', 0))
-            if min_rating and dest_rating < min_rating:
-                continue
-            
-            filtered.append(dest)
-        
-        # Sort by rating (descending)
-        filtered.sort(key=lambda x: x.get('rating', x.get('rating_avg', 0)), reverse=True)
-        
-        # Take top N
-        top_recommendations = filtered[:n_recommendations]
+        # Filter by preferences (vectorized masks) and take top N by rating
+        mask = snapshot.catalog.filter(categories, provinces, min_rating)
+        top_recommendations = [
+            destinations[idx] for idx in snapshot.catalog.top_by_rating(mask, n_recommendations)
+        ]
         
         # Calculate scores (normalized rating)
         max_rating = 5.0
@@ -216,9 +387,9 @@ class RecommenderService:
         If similar_to is provided, finds similar destinations within the filtered set.
         Otherwise, returns top-rated destinations in the filtered set.
         """
-        self._load_model()
+        snapshot = self._load_model()
         
-        if not self._loaded:
+        if snapshot is None:
             return None
         
         # First filter by preferences
@@ -234,17 +405,19 @@ class RecommenderService:
         
         # If similar_to provided, re-rank by similarity
         if similar_to:
-            dest_idx = self._get_destination_index(similar_to)
-            if dest_idx is not None and self._similarity_matrix is not None:
-                sim_scores = self._similarity_matrix[dest_idx]
-                
-                # Add similarity scores to filtered results
-                for rec in filtered:
-                    rec_idx = self._get_destination_index(rec['destination_id'])
-                    if rec_idx is not None:
-                        rec['similarity_score'] = float(sim_scores[rec_idx])
-                    else:
-                        rec['similarity_score'] = 0.0
+            dest_idx = snapshot.id_to_index.get(similar_to)
+            if dest_idx is not None:
+                # Add similarity scores to filtered results (one gather via the id index)
+                rec_indices = np.array(
+                    [snapshot.id_to_index.get(rec['destination_id'], -1) for rec in filtered]
+                )
+                rec_scores = np.where(
+                    rec_indices >= 0,
+                    snapshot.pair_similarity(dest_idx, np.maximum(rec_indices, 0)),
+                    0.0
+                )
+                for rec, score in zip(filtered, rec_scores):
+                    rec['similarity_score'] = float(score)
                 
                 # Sort by similarity
                 filtered.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
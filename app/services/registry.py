@@ -0,0 +1,280 @@
+"""
+Model Registry - Hot-swap retrained artifacts without restarting workers.
+
+This module:
+- Polls models/ for artifacts that changed since each service loaded them
+- Waits until changed files have settled (no longer being written)
+- Reloads in a background thread; services build a new snapshot and swap it
+  in atomically, so the old version keeps serving until the new one is ready
+- Recycles inference worker processes and notifies listeners (e.g. response
+  caches) after a swap
+- Tracks a version counter, reload count and last error per service
+- Keeps a cached model inventory for the health probes (no model loading)
+- Provides SnapshotService, the load/reload plumbing shared by services whose
+  artifacts form one snapshot (recommender, clustering)
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+
+def artifact_mtime(path: Path) -> Optional[int]:
+    """mtime_ns of a model artifact, None if it does not exist."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class SnapshotService:
+    """Base for services whose artifacts are loaded into one immutable snapshot.
+
+    Subclasses implement _artifact_paths() and _build_snapshot(state), where the
+    snapshot keeps `state` (artifact mtimes when the build started) as
+    `snapshot.state`. Requests read one snapshot reference; reload() builds the
+    new snapshot before swapping the reference, so a failed load keeps the
+    previous version serving.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def _artifact_paths(self) -> Dict[str, Path]:
+        raise NotImplementedError
+
+    def _build_snapshot(self, state: Dict[str, Optional[int]]) -> Optional[Any]:
+        raise NotImplementedError
+
+    def artifact_state(self) -> Dict[str, Optional[int]]:
+        """mtime_ns of each artifact on disk (None if missing)."""
+        return {name: artifact_mtime(path) for name, path in self._artifact_paths().items()}
+
+    def loaded_state(self) -> Optional[Dict[str, Optional[int]]]:
+        """artifact_state() as of the loaded snapshot, None if nothing is loaded."""
+        snapshot = self._snapshot
+        return snapshot.state if snapshot is not None else None
+
+    def _load_model(self) -> Optional[Any]:
+        """The current snapshot, loading it from disk on first use."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build_snapshot(self.artifact_state())
+            return self._snapshot
+
+    def reload(self) -> bool:
+        """Load the artifacts on disk into a new snapshot and swap it in; keep the old one on failure."""
+        with self._lock:
+            snapshot = self._build_snapshot(self.artifact_state())
+            if snapshot is None:
+                return False
+            self._snapshot = snapshot
+            return True
+
+
+def _token_mtime(token: Any) -> Optional[int]:
+    """Newest mtime_ns in an artifact version token.
+
+    Tokens are an mtime_ns (recommender, clustering) or a tuple mixing file
+    names and mtimes (forecast: artifact name, mtime, global metadata mtime).
+    """
+    if isinstance(token, int):
+        return token
+    if isinstance(token, tuple):
+        return max((part for part in token if isinstance(part, int)), default=None)
+    return None
+
+
+def _service_getters() -> dict:
+    # Imported on use: the services import this module for SnapshotService
+    from app.services.executor import SERVICE_GETTERS
+    return SERVICE_GETTERS
+
+
+class _ServiceVersion:
+    """Registry bookkeeping for one service."""
+
+    def __init__(self):
+        self.version = 0
+        self.reloads = 0
+        self.failures = 0
+        self.swapped_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.version,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'swapped_at': self.swapped_at,
+            'last_error': self.last_error
+        }
+
+
+class ModelInventory:
+    """Which artifacts exist on disk and which are loaded, computed off the request path.
+
+    Built from directory listings and in-memory state only, so refreshing it
+    never deserializes a model. Health probes read the cached dict.
+    """
+
+    def __init__(self):
+        self._inventory: Optional[dict] = None
+
+    def refresh(self) -> dict:
+        getters = _service_getters()
+        forecast = getters['forecast']()
+        recommender = getters['recommender']()
+        clustering = getters['clustering']()
+
+        available = sorted(forecast.available_provinces())
+        inventory = {
+            'forecast': {
+                'available': len(available),
+                'loaded': len(forecast.loaded_provinces()),
+                'provinces': available
+            },
+            'recommender': {
+                'available': recommender.artifact_state()['metadata'] is not None,
+                'loaded': recommender.loaded_state() is not None
+            },
+            'clustering': {
+                'available': clustering.artifact_state()['metadata'] is not None,
+                'loaded': clustering.loaded_state() is not None
+            },
+            'refreshed_at': datetime.utcnow().isoformat()
+        }
+        self._inventory = inventory
+        return inventory
+
+    def get(self) -> dict:
+        inventory = self._inventory
+        return inventory if inventory is not None else self.refresh()
+
+
+class ModelRegistry:
+    """Watches artifact mtimes and hot-swaps the services that use them."""
+
+    def __init__(self, interval_seconds: float = 30.0, settle_seconds: float = 2.0):
+        self.interval_seconds = interval_seconds
+        self.settle_seconds = settle_seconds
+        self.checks = 0
+        self._versions: Dict[str, _ServiceVersion] = {
+            name: _ServiceVersion() for name in ('forecast', 'recommender', 'clustering')
+        }
+        self._listeners: List[Callable[[str], None]] = []
+        self.inventory = ModelInventory()
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """Call callback(service_name) after each successful swap."""
+        self._listeners.append(callback)
+
+    def _settled(self, state: Dict[str, Any]) -> bool:
+        """True if no artifact was modified within the settle window."""
+        newest = max((_token_mtime(token) or 0 for token in state.values()), default=0)
+        return time.time_ns() - newest >= self.settle_seconds * 1e9
+
+    def changed_services(self) -> List[str]:
+        """Loaded services whose artifacts on disk differ from the loaded version."""
+        changed = []
+        for name, getter in _service_getters().items():
+            try:
+                service = getter()
+                loaded = service.loaded_state()
+                if loaded is None:
+                    # Not loaded yet: the first request loads whatever is on disk
+                    continue
+                state = service.artifact_state()
+                if state != loaded and self._settled(state):
+                    changed.append(name)
+            except Exception as e:
+                # One failing service must not stop the others from being checked
+                self._versions[name].last_error = str(e)
+                print(f"Error checking model artifacts for {name}: {e}")
+        return changed
+
+    async def check_once(self) -> List[str]:
+        """Reload every changed service; returns the names that were swapped."""
+        self.checks += 1
+        swapped = []
+        for name in self.changed_services():
+            if await self._reload(name):
+                swapped.append(name)
+        # New or removed artifacts show up in the health inventory on the next poll
+        await asyncio.to_thread(self.inventory.refresh)
+        return swapped
+
+    async def _reload(self, name: str) -> bool:
+        entry = self._versions[name]
+        entry.last_error = None
+        try:
+            ok = await asyncio.to_thread(_service_getters()[name]().reload)
+        except Exception as e:
+            ok = False
+            entry.last_error = str(e)
+
+        if not ok:
+            entry.failures += 1
+            entry.last_error = entry.last_error or "reload failed, serving previous version"
+            print(f"Model reload failed for {name}; keeping the previous version")
+            return False
+
+        entry.version += 1
+        entry.reloads += 1
+        entry.swapped_at = datetime.utcnow().isoformat()
+        entry.last_error = None
+
+        from app.services.executor import get_inference_executor
+
+        executor = get_inference_executor()
+        if executor.pool_kind(name) == 'process':
+            # Worker processes hold their own copy; new ones load the new version lazily
+            executor.recycle('process')
+
+        for callback in self._listeners:
+            try:
+                callback(name)
+            except Exception as e:
+                print(f"Model reload listener failed for {name}: {e}")
+
+        print(f"Model {name} hot-swapped to registry version {entry.version}")
+        return True
+
+    async def run(self):
+        """Poll until cancelled (no-op when the interval is 0)."""
+        if self.interval_seconds <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.check_once()
+            except Exception as e:
+                print(f"Error checking model artifacts: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'interval_seconds': self.interval_seconds,
+            'checks': self.checks,
+            'services': {name: entry.to_dict() for name, entry in self._versions.items()}
+        }
+
+
+_model_registry = ModelRegistry(
+    interval_seconds=settings.MODEL_RELOAD_INTERVAL_SECONDS,
+    settle_seconds=settings.MODEL_RELOAD_SETTLE_SECONDS
+)
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the singleton model registry."""
+    return _model_registry
@@ -0,0 +1,110 @@
+"""
+Warm-up Service - Eagerly load model artifacts at application startup.
+
+This module:
+- Loads forecast, recommender and clustering artifacts concurrently in a thread pool
+- Records per-artifact load time and outcome
+- Exposes a readiness flag that flips only once every artifact has been attempted
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.clustering import get_clustering_service
+from app.services.forecast import get_forecast_service
+from app.services.recommender import get_recommender_service
+from app.services.registry import get_model_registry
+
+
+class WarmupState:
+    """Readiness state shared by the health endpoints."""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.duration_seconds: Optional[float] = None
+        self.artifacts: Dict[str, dict] = {}
+
+    def to_dict(self) -> dict:
+        return {
+            'ready': self.ready,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration_seconds': self.duration_seconds,
+            'artifacts': self.artifacts
+        }
+
+
+_warmup_state = WarmupState()
+
+
+def get_warmup_state() -> WarmupState:
+    """Get the singleton warm-up state."""
+    return _warmup_state
+
+
+def _load_tasks() -> List[Tuple[str, Callable[[], Optional[dict]]]]:
+    """One loader per artifact; each returns model info or None if unavailable."""
+    forecast_service = get_forecast_service()
+    recommender_service = get_recommender_service()
+    clustering_service = get_clustering_service()
+
+    tasks = [
+        (f"forecast:{province}", lambda p=province: forecast_service.get_model_info(p))
+        for province in forecast_service.available_provinces()
+    ]
+    tasks.append(("recommender", recommender_service.get_model_info))
+    tasks.append(("clustering", clustering_service.get_model_info))
+    return tasks
+
+
+def _timed(loader: Callable[[], Optional[dict]]) -> dict:
+    start = time.perf_counter()
+    try:
+        loaded = loader() is not None
+        error = None
+    except Exception as e:
+        loaded = False
+        error = str(e)
+    return {
+        'loaded': loaded,
+        'seconds': round(time.perf_counter() - start, 4),
+        'error': error
+    }
+
+
+async def warm_up_models(state: Optional[WarmupState] = None) -> WarmupState:
+    """Load all artifacts concurrently and mark the state ready when done."""
+    state = state or _warmup_state
+    state.ready = False
+    state.started_at = datetime.utcnow().isoformat()
+    start = time.perf_counter()
+
+    tasks = _load_tasks()
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, settings.WARMUP_WORKERS),
+        thread_name_prefix="warmup"
+    ) as pool:
+        results = await asyncio.gather(*[
+            loop.run_in_executor(pool, _timed, loader) for _, loader in tasks
+        ])
+
+    state.artifacts = {name: result for (name, _), result in zip(tasks, results)}
+    get_model_registry().inventory.refresh()
+    state.duration_seconds = round(time.perf_counter() - start, 4)
+    state.finished_at = datetime.utcnow().isoformat()
+    state.ready = True
+
+    for name, result in state.artifacts.items():
+        status = "loaded" if result['loaded'] else "unavailable"
+        print(f"Warm-up {name}: {status} in {result['seconds']:.3f}s")
+    print(f"Model warm-up complete in {state.duration_seconds:.3f}s")
+
+    return state
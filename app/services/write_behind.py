@@ -0,0 +1,224 @@
+"""
+Write-Behind - Batched, non-blocking inserts off the request path.
+
+This module:
+- Buffers rows in a bounded asyncio.Queue (submit never waits)
+- Flushes them with one multi-row INSERT every N rows or T milliseconds
+- Drops rows when the buffer is full (backpressure) and counts the drops
+- Drains and flushes what is left on shutdown
+- Impressions go through INSERT ... SELECT so UUID columns are bound as uuid
+  and unknown users/destinations become NULL instead of failing the batch
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, String, Table, bindparam, insert, select
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.sql import Executable
+
+from app.core.config import settings
+from app.models import Destination, MLPredictions, RecommendationsLog, User
+
+
+_STOP = object()
+
+
+class BatchWriter:
+    """Background writer that bulk-inserts rows into one table."""
+
+    def __init__(
+        self,
+        table: Table,
+        batch_size: int = 500,
+        flush_interval_ms: float = 1000.0,
+        max_queue: int = 10000,
+        enabled: bool = True,
+        statement: Optional[Executable] = None
+    ):
+        self.table = table
+        # Executed once per batch with the rows as executemany parameters
+        self.statement = statement if statement is not None else insert(table)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self.max_queue = max(1, max_queue)
+        self.enabled = enabled
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, row: dict) -> bool:
+        """
+        Enqueue a row without waiting.
+
+        Returns:
+            False if the row was dropped (writer stopped or buffer full)
+        """
+        if not self.enabled:
+            return False
+        if self._closing or not self.running:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def submit_many(self, rows: list) -> int:
+        """Enqueue several rows; returns how many were accepted."""
+        return sum(self.submit(row) for row in rows)
+
+    def start(self):
+        """Start the flush loop on the running event loop."""
+        if not self.enabled or self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still buffered and stop the flush loop."""
+        if not self.running:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, rows: list):
+        from app.db import async_session
+
+        start = time.perf_counter()
+        try:
+            async with async_session() as session:
+                # executemany of a Core insert -> batched multi-row VALUES on asyncpg
+                await session.execute(self.statement, rows)
+                await session.commit()
+            self.written += len(rows)
+        except Exception as e:
+            self.failed += len(rows)
+            self.last_error = str(e)
+            print(f"Error flushing {len(rows)} rows into {self.table.name}: {e}")
+        finally:
+            self.flushes += 1
+            self.last_flush_seconds = round(time.perf_counter() - start, 4)
+
+    def stats(self) -> dict:
+        return {
+            'table': self.table.name,
+            'enabled': self.enabled,
+            'running': self.running,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue': self.max_queue,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'written': self.written,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'last_flush_seconds': self.last_flush_seconds,
+            'last_error': self.last_error
+        }
+
+
+_prediction_writer = BatchWriter(
+    MLPredictions.__table__,
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval_ms=settings.WRITE_BEHIND_FLUSH_MS,
+    max_queue=settings.WRITE_BEHIND_QUEUE_SIZE,
+    enabled=settings.LOG_PREDICTIONS
+)
+
+
+def get_prediction_writer() -> BatchWriter:
+    """Get the singleton ml_predictions writer."""
+    return _prediction_writer
+
+
+def _impression_insert() -> Executable:
+    """
+    INSERT INTO recommendations_log ... SELECT with uuid-typed parameters.
+
+    The ORM maps user_id/destination_id as String (asyncpg would bind them as
+    VARCHAR, which Postgres rejects for uuid columns). user_id comes from the
+    client unchecked: looking both ids up keeps the foreign keys satisfied by
+    writing NULL for unknown ones, so one bad row cannot fail the whole batch.
+    """
+    log = RecommendationsLog.__table__
+    users = User.__table__
+    destinations = Destination.__table__
+    user_id = bindparam('user_id', type_=PG_UUID(as_uuid=False))
+    destination_id = bindparam('destination_id', type_=PG_UUID(as_uuid=False))
+
+    return insert(log).from_select(
+        ['user_id', 'destination_id', 'score', 'model_version', 'created_at'],
+        select(
+            select(users.c.id).where(users.c.id == user_id).scalar_subquery(),
+            select(destinations.c.id).where(destinations.c.id == destination_id).scalar_subquery(),
+            bindparam('score', type_=Float),
+            bindparam('model_version', type_=String),
+            bindparam('created_at', type_=DateTime)
+        )
+    )
+
+
+_impression_writer = BatchWriter(
+    RecommendationsLog.__table__,
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval_ms=settings.WRITE_BEHIND_FLUSH_MS,
+    max_queue=settings.WRITE_BEHIND_QUEUE_SIZE,
+    enabled=settings.LOG_RECOMMENDATIONS,
+    statement=_impression_insert()
+)
+
+
+def get_impression_writer() -> BatchWriter:
+    """Get the singleton recommendations_log writer."""
+    return _impression_writer
+
+
+def all_writers() -> list:
+    return [_prediction_writer, _impression_writer]
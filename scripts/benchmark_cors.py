@@ -0,0 +1,119 @@
+"""
+Benchmark the CORS middleware: BaseHTTPMiddleware (before) vs pure ASGI (after).
+
+This script:
+- Builds two minimal FastAPI apps with a small JSON route, one per middleware
+- Drives each app directly through the ASGI interface (no sockets, no server)
+- Reports requests/second and mean latency for GET and OPTIONS requests
+
+Usage:
+    python3 scripts/benchmark_cors.py            # 20000 requests per case
+    BENCH_REQUESTS=50000 python3 scripts/benchmark_cors.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.main import CORS_HEADERS, CORSMiddleware
+
+
+class BaseHTTPCORSMiddleware(BaseHTTPMiddleware):
+    """Previous implementation, kept here as the benchmark baseline."""
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method == "OPTIONS":
+            resp = Response(status_code=200, content="")
+            for k, v in CORS_HEADERS.items():
+                resp.headers[k] = v
+            return resp
+
+        response = await call_next(request)
+        for k, v in CORS_HEADERS.items():
+            response.headers[k] = v
+        return response
+
+
+def build_app(middleware) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware)
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+def make_scope(method: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"origin", b"http://example.com")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 8000),
+    }
+
+
+async def call_app(app, scope: dict):
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # Like a real server: the request body once, then a disconnect
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert any(name == b"access-control-allow-origin" for name, _ in message["headers"])
+
+    await app(scope, receive, send)
+
+
+async def run_requests(app, method: str, n_requests: int) -> float:
+    scope = make_scope(method)
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        await call_app(app, dict(scope))
+    return time.perf_counter() - start
+
+
+async def main():
+    n_requests = int(os.environ.get("BENCH_REQUESTS", "20000"))
+
+    print("⚡ CORS MIDDLEWARE BENCHMARK")
+    print("=" * 80)
+    print(f"Requests per case: {n_requests}\n")
+    print(f"{'middleware':<22}{'method':<10}{'req/s':>12}{'mean µs':>12}")
+
+    results = {}
+    for name, middleware in [("BaseHTTPMiddleware", BaseHTTPCORSMiddleware), ("pure ASGI", CORSMiddleware)]:
+        app = build_app(middleware)
+        for method in ("GET", "OPTIONS"):
+            await run_requests(app, method, min(1000, n_requests))  # warm-up
+            elapsed = await run_requests(app, method, n_requests)
+            results[(name, method)] = n_requests / elapsed
+            print(f"{name:<22}{method:<10}{n_requests / elapsed:>12.0f}{elapsed / n_requests * 1e6:>12.1f}")
+
+    print()
+    for method in ("GET", "OPTIONS"):
+        speedup = results[("pure ASGI", method)] / results[("BaseHTTPMiddleware", method)]
+        print(f"{method}: pure ASGI is {speedup:.2f}x the throughput of BaseHTTPMiddleware")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""
+Benchmark forecast model layouts: one model per province vs one global model.
+
+This script:
+- Trains both layouts on the same 2022-2023 / 2024 split
+  (tourism_statistics from DATABASE_URL, or synthetic data with BENCH_SYNTHETIC=1)
+- Saves the artifacts to a temporary directory (models/ is not touched)
+- Reports artifact size, in-memory flat-forest size, load time and test MAE
+
+Usage:
+    export DATABASE_URL="postgresql://..."
+    python3 scripts/benchmark_forecast_layouts.py
+    BENCH_SYNTHETIC=1 BENCH_PROVINCES=18 python3 scripts/benchmark_forecast_layouts.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.forest import FlatForest
+from train_forecast_baseline import featurize, fetch_data, fit_global, fit_province
+
+
+def synthetic_data(n_provinces: int, seed: int = 42) -> pd.DataFrame:
+    """Monthly 2022-2024 rows with a per-province level, seasonality and noise."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for p in range(n_provinces):
+        level = rng.uniform(1000, 20000)
+        for year in (2022, 2023, 2024):
+            for month in range(1, 13):
+                season = 1 + 0.3 * np.sin(2 * np.pi * month / 12)
+                total = level * season * (1 + 0.05 * (year - 2022)) * rng.normal(1, 0.05)
+                rows.append({
+                    'province': f"Province {p:02d}",
+                    'month': month,
+                    'year': year,
+                    'occupancy_rate': rng.uniform(40, 90),
+                    'avg_stay_days': rng.uniform(2, 7),
+                    'total_visitors': int(total)
+                })
+    return pd.DataFrame(rows)
+
+
+async def load_data() -> pd.DataFrame:
+    if os.environ.get('BENCH_SYNTHETIC') == '1':
+        return synthetic_data(int(os.environ.get('BENCH_PROVINCES', '18')))
+
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        print("❌ DATABASE_URL not set (or use BENCH_SYNTHETIC=1)")
+        return pd.DataFrame()
+    return await fetch_data(database_url)
+
+
+def save(model, directory: Path, name: str) -> tuple:
+    joblib_path = directory / f"{name}.joblib"
+    flat_path = directory / f"{name}.forest.npz"
+    joblib.dump(model, joblib_path)
+    FlatForest.from_sklearn(model).save(flat_path)
+    return joblib_path, flat_path
+
+
+def timed(fn, paths) -> float:
+    start = time.perf_counter()
+    loaded = [fn(path) for path in paths]
+    elapsed = (time.perf_counter() - start) * 1000
+    del loaded
+    return elapsed
+
+
+def flat_bytes(paths) -> int:
+    total = 0
+    for path in paths:
+        forest = FlatForest.load(path)
+        total += sum(a.nbytes for a in (forest.roots, forest.feature, forest.threshold,
+                                        forest.left, forest.right, forest.value))
+    return total
+
+
+def weighted_mae(metrics: dict) -> float:
+    """MAE over all test rows from per-province {'mae', 'test_samples'}."""
+    scored = [m for m in metrics.values() if m.get('mae') is not None and m['test_samples']]
+    n = sum(m['test_samples'] for m in scored)
+    return sum(m['mae'] * m['test_samples'] for m in scored) / n if n else float('nan')
+
+
+async def main() -> int:
+    df = await load_data()
+    if df.empty:
+        return 1
+    df = featurize(df)
+    provinces = sorted(df['province'].unique().tolist())
+
+    print("🌍 FORECAST LAYOUT BENCHMARK: per-province vs global")
+    print("=" * 80)
+    print(f"Provinces: {len(provinces)}, rows: {len(df)}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+
+        per_province_paths, per_province_metrics = [], {}
+        start = time.perf_counter()
+        for province in provinces:
+            fitted = fit_province(df, province)
+            if fitted is None:
+                continue
+            model, metrics = fitted
+            per_province_metrics[province] = metrics
+            per_province_paths.append(save(model, tmp_dir, f"forecast_{province.replace(' ', '_')}"))
+        per_province_train = time.perf_counter() - start
+
+        start = time.perf_counter()
+        global_model, metadata = fit_global(df)
+        global_train = time.perf_counter() - start
+        global_paths = [save(global_model, tmp_dir, "global_forecast")]
+
+        layouts = [
+            ("per-province", per_province_paths, per_province_train, weighted_mae(per_province_metrics)),
+            ("global", global_paths, global_train, metadata['overall']['mae'] or float('nan')),
+        ]
+
+        print(f"{'layout':<14}{'files':>6}{'joblib KB':>11}{'npz KB':>9}{'RAM KB':>9}"
+              f"{'joblib ms':>11}{'npz ms':>9}{'train s':>9}{'MAE':>10}")
+        for name, paths, train_seconds, mae in layouts:
+            joblib_paths = [p[0] for p in paths]
+            npz_paths = [p[1] for p in paths]
+            print(
+                f"{name:<14}{len(paths):>6}"
+                f"{sum(p.stat().st_size for p in joblib_paths) / 1024:>11.1f}"
+                f"{sum(p.stat().st_size for p in npz_paths) / 1024:>9.1f}"
+                f"{flat_bytes(npz_paths) / 1024:>9.1f}"
+                f"{timed(joblib.load, joblib_paths):>11.1f}"
+                f"{timed(FlatForest.load, npz_paths):>9.1f}"
+                f"{train_seconds:>9.2f}"
+                f"{mae:>10.1f}"
+            )
+
+    print("\nMAE per province (test year 2024):")
+    print(f"{'province':<22}{'per-province':>14}{'global':>10}")
+    for province in provinces:
+        own = per_province_metrics.get(province, {}).get('mae')
+        shared = metadata['metrics'].get(province.replace(' ', '_'), {}).get('mae')
+        own_str = f"{own:.1f}" if own is not None else "-"
+        shared_str = f"{shared:.1f}" if shared is not None else "-"
+        print(f"{province:<22}{own_str:>14}{shared_str:>10}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
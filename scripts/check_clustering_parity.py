@@ -0,0 +1,73 @@
+"""
+Check that the NumPy nearest-centroid path matches the sklearn path.
+
+This script:
+- Loads the trained clustering model through ClusteringService
+- Generates random user profiles covering the feature ranges
+- Compares cluster ids and distances from both inference paths
+- Reports single-user latency for each path
+
+Usage:
+    python3 scripts/check_clustering_parity.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.clustering import get_clustering_service
+
+
+def random_profiles(n_samples: int, seed: int = 42) -> np.ndarray:
+    """Random profiles in FEATURE_ORDER (budget, duration, 5 prefs, trips, group)."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(1, 4, n_samples),
+        rng.uniform(1, 21, n_samples),
+        rng.uniform(0, 1, (n_samples, 5)),
+        rng.integers(1, 9, n_samples),
+        rng.integers(1, 8, n_samples),
+    ]).astype(np.float64)
+
+
+def time_single(assign, X: np.ndarray, repeats: int = 500) -> float:
+    start = time.perf_counter()
+    for i in range(repeats):
+        assign(X[i % len(X):i % len(X) + 1])
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main() -> int:
+    service = get_clustering_service()
+    if service.get_model_info() is None:
+        print("❌ Clustering model not found. Run scripts/train_clustering.py first.")
+        return 1
+
+    X = random_profiles(10000)
+    sk_ids, sk_dist = service._assign_sklearn(X)
+    np_ids, np_dist = service._assign_numpy(X)
+
+    label_mismatches = int((sk_ids != np_ids).sum())
+    max_dist_diff = float(np.abs(sk_dist - np_dist).max())
+
+    print("🔍 CLUSTERING PARITY: sklearn vs NumPy fast path")
+    print(f"   Samples: {len(X)}")
+    print(f"   Cluster id mismatches: {label_mismatches}")
+    print(f"   Max distance difference: {max_dist_diff:.2e}")
+    print(f"   Single-user latency (sklearn): {time_single(service._assign_sklearn, X):.1f} µs")
+    print(f"   Single-user latency (NumPy):   {time_single(service._assign_numpy, X):.1f} µs")
+
+    if label_mismatches or max_dist_diff > 1e-9:
+        print("❌ Paths disagree")
+        return 1
+
+    print("✅ Paths agree")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
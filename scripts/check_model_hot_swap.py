@@ -0,0 +1,130 @@
+"""
+Check that retrained artifacts are hot-swapped by the model registry.
+
+This script:
+- Copies models/ to a temporary directory (the real artifacts are not touched)
+- Loads a forecast province, the recommender and the clustering model
+- "Retrains" the province by writing a new flat-forest artifact with doubled
+  leaf values, and touches the recommender/clustering metadata
+- Runs one ModelRegistry check and verifies every service was swapped, the
+  new forecast is served and the health inventory was refreshed
+
+Usage:
+    python3 scripts/check_model_hot_swap.py
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.clustering import get_clustering_service
+from app.services.forecast import get_forecast_service
+from app.services.forest import FlatForest
+from app.services.recommender import get_recommender_service
+from app.services.registry import ModelRegistry
+
+
+MODEL_DIR = Path("models")
+
+
+def retrain_province(province: str, mtime: float):
+    """Write a new forecast_{province}.forest.npz whose predictions are doubled."""
+    entry = get_forecast_service()._load_model(province)
+    forest = entry.forest
+    retrained = FlatForest(
+        forest.roots, forest.feature, forest.threshold,
+        forest.left, forest.right, forest.value * 2, forest.max_depth
+    )
+    path = MODEL_DIR / f"forecast_{province.replace(' ', '_')}.forest.npz"
+    retrained.save(path)
+    os.utime(path, (mtime, mtime))
+
+
+def touch(path: Path, mtime: float) -> bool:
+    if not path.exists():
+        return False
+    os.utime(path, (mtime, mtime))
+    return True
+
+
+async def check() -> int:
+    forecast = get_forecast_service()
+    provinces = sorted(forecast.available_provinces())
+    if not provinces:
+        print("❌ No forecast models found. Run scripts/train_forecast_baseline.py first.")
+        return 1
+    province = provinces[0]
+
+    before = forecast.predict(province, 2025, 6)
+    old_version = forecast._load_model(province).version
+    expected = {'forecast'}
+    if get_recommender_service()._load_model() is not None:
+        expected.add('recommender')
+    if get_clustering_service()._load_model() is not None:
+        expected.add('clustering')
+
+    registry = ModelRegistry(interval_seconds=0, settle_seconds=1)
+    inventory_before = registry.inventory.refresh()['refreshed_at']
+
+    # Older than the settle window, newer than the loaded artifacts
+    mtime = time.time() - 5
+    retrain_province(province, mtime)
+    touch(MODEL_DIR / "recommender_metadata.json", mtime)
+    touch(MODEL_DIR / "clustering_metadata.json", mtime)
+
+    swapped = set(await registry.check_once())
+    after = forecast.predict(province, 2025, 6)
+    new_version = forecast._load_model(province).version
+
+    print("🔁 MODEL HOT-SWAP CHECK")
+    print(f"   Province: {province}")
+    print(f"   Swapped: {sorted(swapped)} (expected {sorted(expected)})")
+    print(f"   Forecast version: {old_version} -> {new_version}")
+    print(f"   Prediction: {before['predicted_visitors']} -> {after['predicted_visitors']}")
+
+    failures = []
+    if swapped != expected:
+        failures.append("not every changed service was swapped")
+    if new_version == old_version:
+        failures.append("forecast version did not change")
+    if abs(after['predicted_visitors'] - 2 * before['predicted_visitors']) > 1:
+        failures.append("the retrained forecast is not served")
+    if registry.inventory.get()['refreshed_at'] == inventory_before:
+        failures.append("health inventory was not refreshed")
+    for name, entry in registry.stats()['services'].items():
+        if entry['last_error']:
+            failures.append(f"{name}: {entry['last_error']}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+
+    print("✅ Retrained artifacts were hot-swapped")
+    return 0
+
+
+def main() -> int:
+    if not MODEL_DIR.exists():
+        print("❌ models/ not found. Train the models first.")
+        return 1
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copytree(MODEL_DIR.resolve(), Path(tmp) / "models")
+        # Services resolve models/ relative to the working directory
+        os.chdir(tmp)
+        try:
+            return asyncio.run(check())
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
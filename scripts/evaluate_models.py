@@ -161,11 +161,11 @@ def evaluate_province(df: pd.DataFrame, province: str) -> Dict:
     }
 
 
-async def main():
+async def main() -> int:
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         print("❌ DATABASE_URL not set")
-        return
+        return 1
     
     print("📊 MODEL EVALUATION - Wenda ML Backend")
     print("=" * 80)
@@ -175,7 +175,7 @@ async def main():
     df = await fetch_data(database_url)
     if df.empty:
         print("❌ No data found")
-        return
+        return 1
     
     df = featurize(df)
     provinces = df['province'].unique().tolist()
@@ -185,7 +185,9 @@ async def main():
     
     # Evaluate each province
     results = []
-    for province in provinces:
+    for i, province in enumerate(provinces, 1):
+        # "[i/n]" lines are read as progress by the /ml/jobs runner
+        print(f"[{i}/{len(provinces)}] Evaluating {province}")
         result = evaluate_province(df, province)
         if result:
             results.append(result)
@@ -222,7 +224,9 @@ async def main():
         print(f"Average MAE across provinces: {avg_mae:.0f} visitors")
         print(f"Average MAPE across provinces: {avg_mape:.1f}%")
         print(f"Models evaluated: {len(evaluated)}/{len(provinces)}")
+    
+    return 0
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    raise SystemExit(asyncio.run(main()))
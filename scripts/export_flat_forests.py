@@ -0,0 +1,97 @@
+"""
+Convert trained forecast models to the compact flat-forest format.
+
+This script:
+- Flattens every models/forecast_{province}.joblib into forecast_{province}.forest.npz
+- Checks that the flat forest reproduces the sklearn per-tree predictions exactly
+- Reports artifact size and load time for both formats
+
+Models trained with scripts/train_forecast_baseline.py are already exported;
+use this for artifacts trained before the flat format existed.
+
+Usage:
+    python3 scripts/export_flat_forests.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.forest import FlatForest
+
+
+MODEL_DIR = Path("models")
+
+
+def random_features(n_samples: int, seed: int = 42) -> np.ndarray:
+    """Rows in training column order: year, month_sin, month_cos, occupancy_rate, avg_stay_days."""
+    rng = np.random.default_rng(seed)
+    months = rng.integers(1, 13, n_samples)
+    return np.column_stack([
+        rng.integers(2020, 2031, n_samples),
+        np.sin(2 * np.pi * months / 12),
+        np.cos(2 * np.pi * months / 12),
+        rng.uniform(0, 100, n_samples),
+        rng.uniform(0, 15, n_samples),
+    ])
+
+
+def timed_load(loader, path: Path, repeats: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        loader(path)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main() -> int:
+    model_paths = sorted(MODEL_DIR.glob("forecast_*.joblib"))
+    if not model_paths:
+        print("❌ No forecast models found. Run scripts/train_forecast_baseline.py first.")
+        return 1
+
+    print("📦 FLAT FOREST EXPORT")
+    print("=" * 80)
+    print(f"{'province':<20}{'joblib KB':>12}{'npz KB':>10}{'joblib ms':>12}{'npz ms':>10}  parity")
+
+    X = random_features(2000)
+    failures = 0
+    for model_path in model_paths:
+        province = model_path.stem.replace('forecast_', '')
+        flat_path = MODEL_DIR / f"forecast_{province}.forest.npz"
+
+        model = joblib.load(model_path)
+        forest = FlatForest.from_sklearn(model)
+        if forest is None:
+            print(f"{province:<20}  ⚠️  not a single-output forest, skipped")
+            continue
+        forest.save(flat_path)
+
+        expected = np.stack([tree.predict(X.astype(np.float32)) for tree in model.estimators_])
+        loaded = FlatForest.load(flat_path)
+        exact = np.array_equal(loaded.predict_all(X), expected)
+        failures += not exact
+
+        print(
+            f"{province:<20}"
+            f"{model_path.stat().st_size / 1024:>12.1f}"
+            f"{flat_path.stat().st_size / 1024:>10.1f}"
+            f"{timed_load(joblib.load, model_path):>12.2f}"
+            f"{timed_load(FlatForest.load, flat_path):>10.2f}"
+            f"  {'✅' if exact else '❌'}"
+        )
+
+    if failures:
+        print(f"\n❌ {failures} model(s) do not match their sklearn predictions")
+        return 1
+
+    print("\n✅ All flat forests match sklearn")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
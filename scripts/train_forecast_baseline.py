@@ -5,20 +5,41 @@ Approach:
 - Load `tourism_statistics` from DB (domestic_visitors + foreign_visitors -> total_visitors)
 - Create features: year, month, month_sin, month_cos to capture seasonality
 - Train per-province RandomForestRegressor on 2022-2023, validate on 2024
+  (TRAIN_WORKERS > 1 fans provinces out over a process pool, 0 uses one worker
+  per core; each model then uses TRAIN_THREADS_PER_MODEL threads, default
+  cores // workers)
 - Save models to `models/forecast_{province}.joblib`
+- Export a flat-array copy to `models/forecast_{province}.forest.npz`
+  (loaded by ForecastService without unpickling or sklearn)
 - Save metrics to `models/metrics_{province}.json`
+- Retrain only provinces whose data changed: a fingerprint per province
+  (row count, latest year/month, checksum of the rows) is kept in
+  `models/training_fingerprints.json`; TRAIN_FULL=1 retrains everything
+- Delete the model and metrics files of provinces that no longer have data,
+  so the API stops serving them
+- Optionally (FORECAST_MODEL_LAYOUT=global|both) train one global model with a
+  one-hot province feature -> `models/global_forecast.joblib` / `.forest.npz`
+  and `models/global_forecast_metadata.json` (province order + metrics)
 
 Usage:
     export DATABASE_URL="postgresql://..."
     python3 scripts/train_forecast_baseline.py
+    FORECAST_MODEL_LAYOUT=both python3 scripts/train_forecast_baseline.py
+    TRAIN_WORKERS=4 python3 scripts/train_forecast_baseline.py
+    TRAIN_WORKERS=0 python3 scripts/train_forecast_baseline.py
+    TRAIN_FULL=1 python3 scripts/train_forecast_baseline.py
 
 """
 
 import asyncio
+import multiprocessing
 import os
+import sys
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import asyncpg
 import pandas as pd
@@ -27,10 +48,19 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
 import joblib
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.forest import FlatForest
+
 
 MODEL_DIR = Path("models")
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
+FEATURES = ['year', 'month_sin', 'month_cos', 'occupancy_rate', 'avg_stay_days']
+GLOBAL_MODEL_NAME = "global_forecast"
+SUMMARY_PATH = MODEL_DIR / "training_summary.json"
+FINGERPRINTS_PATH = MODEL_DIR / "training_fingerprints.json"
+
 
 def normalize_database_url(url: str) -> str:
     # adapt neon URL to asyncpg connect usage
@@ -39,17 +69,22 @@ def normalize_database_url(url: str) -> str:
     return url
 
 
-async def fetch_data(database_url: str) -> pd.DataFrame:
+async def fetch_data(database_url: str, provinces: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load tourism_statistics, optionally only for some provinces."""
     database_url = normalize_database_url(database_url)
     conn = await asyncpg.connect(database_url, ssl='require')
 
-    rows = await conn.fetch(
-        "SELECT province, month, year, domestic_visitors, foreign_visitors, occupancy_rate, avg_stay_days FROM tourism_statistics"
-    )
+    query = "SELECT province, month, year, domestic_visitors, foreign_visitors, occupancy_rate, avg_stay_days FROM tourism_statistics"
+    if provinces is None:
+        rows = await conn.fetch(query)
+    else:
+        rows = await conn.fetch(query + " WHERE province = ANY($1::text[])", provinces)
     await conn.close()
 
     records = [dict(r) for r in rows]
     df = pd.DataFrame(records)
+    if df.empty:
+        return df
     # total visitors
     df['domestic_visitors'] = df['domestic_visitors'].fillna(0).astype(int)
     df['foreign_visitors'] = df['foreign_visitors'].fillna(0).astype(int)
@@ -57,6 +92,72 @@ async def fetch_data(database_url: str) -> pd.DataFrame:
     return df
 
 
+async def fetch_fingerprints(database_url: str) -> dict:
+    """
+    Per-province data fingerprint computed in the database (no rows are transferred).
+
+    Returns:
+        {province: {'rows', 'last_period' (year * 100 + month), 'checksum'}}
+    """
+    database_url = normalize_database_url(database_url)
+    conn = await asyncpg.connect(database_url, ssl='require')
+
+    rows = await conn.fetch(
+        """
+        SELECT province,
+               count(*) AS rows,
+               max(year * 100 + month) AS last_period,
+               md5(string_agg(
+                   ROW(year, month, domestic_visitors, foreign_visitors, occupancy_rate, avg_stay_days)::text,
+                   ';' ORDER BY year, month,
+                   ROW(year, month, domestic_visitors, foreign_visitors, occupancy_rate, avg_stay_days)::text
+               )) AS checksum
+        FROM tourism_statistics
+        GROUP BY province
+        """
+    )
+    await conn.close()
+
+    return {
+        r['province']: {'rows': r['rows'], 'last_period': r['last_period'], 'checksum': r['checksum']}
+        for r in rows
+    }
+
+
+def read_json(path: Path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def stale_provinces(current: dict, previous: dict) -> List[str]:
+    """Provinces whose data changed since the last run, or whose artifacts are missing."""
+    stale = []
+    for province, fingerprint in current.items():
+        name = province.replace(' ', '_')
+        artifacts_exist = (
+            (MODEL_DIR / f"forecast_{name}.joblib").exists()
+            and (MODEL_DIR / f"forecast_{name}.forest.npz").exists()
+        )
+        if previous.get(province) != fingerprint or not artifacts_exist:
+            stale.append(province)
+    return stale
+
+
+def orphaned_artifacts(fingerprints: dict) -> List[Path]:
+    """Model, flat-forest and metrics files of provinces that no longer have data."""
+    keep = {province.replace(' ', '_') for province in fingerprints}
+    orphans = []
+    for pattern, prefix in (("forecast_*.joblib", 'forecast_'), ("forecast_*.forest.npz", 'forecast_'),
+                            ("metrics_*.json", 'metrics_')):
+        for path in MODEL_DIR.glob(pattern):
+            if path.name[len(prefix):].split('.', 1)[0] not in keep:
+                orphans.append(path)
+    return sorted(orphans)
+
+
 def featurize(df: pd.DataFrame) -> pd.DataFrame:
     # Ensure types
     df['year'] = df['year'].astype(int)
@@ -75,7 +176,8 @@ def featurize(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def train_and_save(df: pd.DataFrame, province: str):
+def fit_province(df: pd.DataFrame, province: str, n_jobs: Optional[int] = None):
+    """Fit one province's model; returns (model, metrics) or None if no data."""
     # Filter by province
     d = df[df['province'] == province].copy()
     if d.empty:
@@ -86,8 +188,7 @@ def train_and_save(df: pd.DataFrame, province: str):
     d = d.sort_values(['year', 'month'])
 
     # Features and target
-    features = ['year', 'month_sin', 'month_cos', 'occupancy_rate', 'avg_stay_days']
-    X = d[features]
+    X = d[FEATURES]
     y = d['total_visitors']
 
     # Train on years 2022-2023, test on 2024 if available
@@ -102,8 +203,8 @@ def train_and_save(df: pd.DataFrame, province: str):
     X_test = X[test_mask]
     y_test = y[test_mask]
 
-    # Simple model: RandomForestRegressor
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    # Simple model: RandomForestRegressor (n_jobs threads build the trees)
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
 
     # Evaluate
@@ -121,43 +222,281 @@ def train_and_save(df: pd.DataFrame, province: str):
         metrics['mape'] = None
         metrics['test_samples'] = 0
 
+    return model, metrics
+
+
+def train_and_save(df: pd.DataFrame, province: str, n_jobs: Optional[int] = None):
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    fitted = fit_province(df, province, n_jobs=n_jobs)
+    if fitted is None:
+        return None
+    model, metrics = fitted
+
     # Save model and metrics
     model_path = MODEL_DIR / f"forecast_{province.replace(' ', '_')}.joblib"
     metrics_path = MODEL_DIR / f"metrics_{province.replace(' ', '_')}.json"
+    flat_path = MODEL_DIR / f"forecast_{province.replace(' ', '_')}.forest.npz"
     joblib.dump(model, model_path)
+    FlatForest.from_sklearn(model).save(flat_path)
     with open(metrics_path, 'w') as f:
         json.dump(metrics, f, indent=2)
 
     print(f"Saved model for {province} -> {model_path} (metrics: {metrics})")
-    return {'province': province, 'model_path': str(model_path), 'metrics': metrics}
+    return {
+        'province': province,
+        'model_path': str(model_path),
+        'flat_model_path': str(flat_path),
+        'metrics': metrics,
+        # process_time covers every thread of this process (the n_jobs tree builders included)
+        'wall_seconds': round(time.perf_counter() - wall_start, 3),
+        'cpu_seconds': round(time.process_time() - cpu_start, 3)
+    }
+
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+_worker_df: Optional[pd.DataFrame] = None
+_worker_n_jobs: Optional[int] = None
 
 
-async def main():
+def _init_worker(df: pd.DataFrame, n_jobs: int):
+    """Process pool initializer: receive the data once and cap native thread pools."""
+    global _worker_df, _worker_n_jobs
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(limits=n_jobs)
+    _worker_df = df
+    _worker_n_jobs = n_jobs
+
+
+def _train_in_worker(province: str):
+    return train_and_save(_worker_df, province, n_jobs=_worker_n_jobs)
+
+
+def train_provinces(df: pd.DataFrame, provinces: List[str], workers: int, threads: int) -> list:
+    """
+    Train and save every province, in parallel when workers > 1.
+
+    Returns the train_and_save results in `provinces` order.
+    """
+    done = {}
+    if workers <= 1:
+        for i, p in enumerate(provinces, 1):
+            # "[i/n]" lines are read as progress by the /ml/jobs runner
+            print(f"[{i}/{len(provinces)}] Training {p}")
+            done[p] = train_and_save(df, p, n_jobs=threads)
+    else:
+        # Inherited by the workers before they import numpy/sklearn: workers x threads <= cores
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = str(threads)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(df, threads)
+        ) as pool:
+            futures = {pool.submit(_train_in_worker, p): p for p in provinces}
+            for i, future in enumerate(as_completed(futures), 1):
+                p = futures[future]
+                try:
+                    done[p] = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Training {p} failed: {e}")
+                    done[p] = None
+                print(f"[{i}/{len(provinces)}] Trained {p}", flush=True)
+
+    return [done[p] for p in provinces if done.get(p)]
+
+
+def report_timings(results: list, elapsed: float):
+    """Print wall-clock vs CPU time per province and the overall speedup."""
+    print(f"\n{'province':<24}{'wall s':>9}{'cpu s':>9}{'cpu/wall':>10}")
+    for res in sorted(results, key=lambda r: r['wall_seconds'], reverse=True):
+        ratio = res['cpu_seconds'] / res['wall_seconds'] if res['wall_seconds'] else 0.0
+        print(f"{res['province']:<24}{res['wall_seconds']:>9.2f}{res['cpu_seconds']:>9.2f}{ratio:>10.2f}")
+
+    serial = sum(r['wall_seconds'] for r in results)
+    cpu = sum(r['cpu_seconds'] for r in results)
+    speedup = serial / elapsed if elapsed else 0.0
+    print(f"{'total':<24}{serial:>9.2f}{cpu:>9.2f}")
+    print(f"Elapsed {elapsed:.2f}s for {len(results)} provinces ({speedup:.1f}x vs. the summed per-province time)")
+
+
+def global_features(df: pd.DataFrame, provinces: List[str]) -> pd.DataFrame:
+    """Per-province features plus one one-hot column per province (in `provinces` order)."""
+    X = df[FEATURES].copy()
+    for province in provinces:
+        X[f"province_{province.replace(' ', '_')}"] = (df['province'] == province).astype(float)
+    return X
+
+
+def evaluate_by_province(d: pd.DataFrame, preds: np.ndarray) -> dict:
+    """MAE/MAPE per province for rows in d (aligned with preds)."""
+    metrics = {}
+    for province, idx in d.groupby('province').indices.items():
+        y_true = d['total_visitors'].to_numpy()[idx]
+        y_pred = preds[idx]
+        metrics[province.replace(' ', '_')] = {
+            'mae': float(mean_absolute_error(y_true, y_pred)),
+            'mape': float(np.mean(np.abs((y_true - y_pred) / np.where(y_true == 0, 1, y_true))) * 100),
+            'test_samples': int(len(idx))
+        }
+    return metrics
+
+
+def fit_global(df: pd.DataFrame):
+    """Fit one model for every province (one-hot province feature); returns (model, metadata)."""
+    provinces = sorted(df['province'].unique().tolist())
+    d = df.sort_values(['province', 'year', 'month'])
+    X = global_features(d, provinces)
+    y = d['total_visitors']
+
+    train_mask = (d['year'] < 2024).to_numpy()
+    test_mask = (d['year'] == 2024).to_numpy()
+
+    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model.fit(X[train_mask], y[train_mask])
+
+    metrics = {}
+    overall = {'mae': None, 'mape': None, 'test_samples': 0}
+    if test_mask.any():
+        test = d[test_mask]
+        preds = model.predict(X[test_mask])
+        metrics = evaluate_by_province(test, preds)
+        y_test = test['total_visitors'].to_numpy()
+        overall = {
+            'mae': float(mean_absolute_error(y_test, preds)),
+            'mape': float(np.mean(np.abs((y_test - preds) / np.where(y_test == 0, 1, y_test))) * 100),
+            'test_samples': int(len(y_test))
+        }
+
+    metadata = {
+        'provinces': [p.replace(' ', '_') for p in provinces],
+        'features': list(X.columns),
+        'metrics': metrics,
+        'overall': overall
+    }
+    return model, metadata
+
+
+def train_global(df: pd.DataFrame, fingerprints: Optional[dict] = None) -> dict:
+    """Train the global model and save it with its metadata (and the data fingerprints it saw)."""
+    model, metadata = fit_global(df)
+    metadata['fingerprints'] = fingerprints or {}
+
+    model_path = MODEL_DIR / f"{GLOBAL_MODEL_NAME}.joblib"
+    flat_path = MODEL_DIR / f"{GLOBAL_MODEL_NAME}.forest.npz"
+    metadata_path = MODEL_DIR / f"{GLOBAL_MODEL_NAME}_metadata.json"
+    joblib.dump(model, model_path)
+    FlatForest.from_sklearn(model).save(flat_path)
+
+    # Written last: ForecastService only routes provinces listed here to the global model
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    print(
+        f"Saved global model for {len(metadata['provinces'])} provinces -> {model_path} "
+        f"(overall: {metadata['overall']})"
+    )
+    return metadata
+
+
+async def main() -> int:
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         print("DATABASE_URL not set")
-        return
+        return 1
 
-    df = await fetch_data(database_url)
-    if df.empty:
+    layout = os.environ.get('FORECAST_MODEL_LAYOUT', 'per_province')
+    if layout not in ('per_province', 'global', 'both'):
+        print(f"Invalid FORECAST_MODEL_LAYOUT '{layout}' (use per_province, global or both)")
+        return 1
+
+    fingerprints = await fetch_fingerprints(database_url)
+    if not fingerprints:
         print("No tourism_statistics data found")
-        return
+        return 1
+
+    full = os.environ.get('TRAIN_FULL') == '1'
+    previous = {} if full else read_json(FINGERPRINTS_PATH, {})
+    removed = sorted(set(previous) - set(fingerprints))
+    stale = sorted(fingerprints) if full else stale_provinces(fingerprints, previous)
+    # Per-province artifacts without data would keep being served: delete them
+    orphans = [] if layout == 'global' else orphaned_artifacts(fingerprints)
+    if layout == 'global':
+        stale, removed = [], []
+
+    # The global model is fitted on every province: retrain it when any fingerprint moved
+    global_meta = read_json(MODEL_DIR / f"{GLOBAL_MODEL_NAME}_metadata.json", {})
+    train_global_model = layout in ('global', 'both') and (
+        full or global_meta.get('fingerprints') != fingerprints
+    )
 
-    df = featurize(df)
+    if not stale and not removed and not orphans and not train_global_model:
+        print(f"All {len(fingerprints)} provinces are up to date, nothing to retrain")
+        return 0
+    print(
+        f"{len(stale)}/{len(fingerprints)} provinces changed"
+        + (f", {len(removed)} removed" if removed else "")
+        + (f", {len(orphans)} orphaned artifact(s)" if orphans else "")
+        + (", global model stale" if train_global_model else "")
+        + (" (full retrain)" if full else "")
+    )
 
-    provinces = df['province'].unique().tolist()
-    results = []
-    for p in provinces:
-        res = train_and_save(df, p)
-        if res:
-            results.append(res)
+    # The global model always needs every province; per-province only the changed ones
+    if stale or train_global_model:
+        df = await fetch_data(database_url, None if train_global_model else stale)
+        if df.empty:
+            print("No tourism_statistics data found")
+            return 1
+        df = featurize(df)
+
+    if train_global_model:
+        train_global(df, fingerprints)
+
+    for path in orphans:
+        try:
+            path.unlink()
+            print(f"Removed {path} (no tourism_statistics data for this province)")
+        except OSError as e:
+            print(f"Could not remove {path}: {e}")
+
+    if layout == 'global':
+        return 0
+
+    cores = os.cpu_count() or 1
+    # TRAIN_WORKERS=0 sizes the pool to the machine
+    workers = int(os.environ.get('TRAIN_WORKERS', '1'))
+    workers = cores if workers == 0 else max(1, workers)
+    threads = int(os.environ.get('TRAIN_THREADS_PER_MODEL', '0')) or max(1, cores // workers)
 
-    # Summary
-    summary_path = MODEL_DIR / "training_summary.json"
-    with open(summary_path, 'w') as f:
-        json.dump(results, f, indent=2)
-    print(f"Training complete. Summary written to {summary_path}")
+    results = []
+    if stale:
+        print(f"Training {len(stale)} provinces with {workers} worker(s) x {threads} thread(s)")
+        start = time.perf_counter()
+        results = train_provinces(df, stale, workers, threads)
+        report_timings(results, time.perf_counter() - start)
+
+    # Summary: fresh results plus the untouched entries of provinces that still have data
+    trained = {r['province'] for r in results}
+    kept = [
+        r for r in read_json(SUMMARY_PATH, [])
+        if r.get('province') in fingerprints and r.get('province') not in trained
+    ]
+    with open(SUMMARY_PATH, 'w') as f:
+        json.dump(kept + results, f, indent=2)
+
+    # Only successfully trained provinces get their new fingerprint: failures retry next run
+    recorded = {p: fp for p, fp in previous.items() if p in fingerprints and p not in stale}
+    recorded.update({p: fingerprints[p] for p in trained})
+    with open(FINGERPRINTS_PATH, 'w') as f:
+        json.dump(recorded, f, indent=2)
+
+    print(f"Training complete. Summary written to {SUMMARY_PATH} ({len(results)} retrained, {len(kept)} unchanged)")
+    return 0
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    raise SystemExit(asyncio.run(main()))
@@ -10,8 +10,16 @@ This script creates a recommender system based on destination features:
 The model can recommend similar destinations or personalized recommendations
 based on user preferences.
 
+Similarity storage (RECOMMENDER_SIMILARITY_MODE):
+- dense (default): full N x N cosine similarity matrix
+- topk: only the top RECOMMENDER_TOP_K neighbors per destination
+  (int32 ids + float32 scores), computed in chunks without an N x N matrix
+- ondemand: no precomputed similarities; the service computes them from the
+  L2-normalized feature matrix at request time
+
 Usage:
     export DATABASE_URL="postgresql://..."
+    export RECOMMENDER_SIMILARITY_MODE=topk   # optional
     python3 scripts/train_recommender.py
 """
 
@@ -31,6 +39,8 @@ import asyncpg
 MODEL_DIR = Path("models")
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
+SIMILARITY_MODES = ("dense", "topk", "ondemand")
+
 
 def normalize_database_url(url: str) -> str:
     if url.startswith("postgresql+asyncpg://"):
@@ -144,6 +154,46 @@ def compute_similarity_matrix(features: np.ndarray):
     return cosine_similarity(features)
 
 
+def normalize_features(features: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so cosine similarity becomes a dot product."""
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (features / norms).astype(np.float32)
+
+
+def compute_top_k_neighbors(normalized: np.ndarray, k: int, chunk_size: int = 1024):
+    """
+    Top-k cosine neighbors per destination (excluding itself), best first.
+    
+    Similarities are computed one chunk of rows at a time, so peak memory is
+    chunk_size x N instead of N x N.
+    
+    Returns:
+        (neighbor_indices int32 [N, k], neighbor_scores float32 [N, k])
+    """
+    n = normalized.shape[0]
+    k = max(0, min(k, n - 1))
+    neighbor_idx = np.zeros((n, k), dtype=np.int32)
+    neighbor_scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbor_idx, neighbor_scores
+    
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        block = normalized[start:end] @ normalized.T
+        rows = np.arange(end - start)
+        block[rows, rows + start] = -np.inf
+        
+        top = np.argpartition(block, n - k, axis=1)[:, n - k:]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        
+        neighbor_idx[start:end] = np.take_along_axis(top, order, axis=1)
+        neighbor_scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+    
+    return neighbor_idx, neighbor_scores
+
+
 def get_top_similar_destinations(
     similarity_matrix: np.ndarray,
     destination_idx: int,
@@ -237,10 +287,29 @@ async def main():
     print(f"   Categories: {categories}")
     print(f"   Provinces: {provinces}")
     
-    # Compute similarity matrix
-    print("\n📊 Computing destination similarity matrix...")
-    similarity_matrix = compute_similarity_matrix(features)
-    print(f"✅ Similarity matrix: {similarity_matrix.shape}")
+    similarity_mode = os.environ.get('RECOMMENDER_SIMILARITY_MODE', 'dense').lower()
+    if similarity_mode not in SIMILARITY_MODES:
+        print(f"❌ Invalid RECOMMENDER_SIMILARITY_MODE '{similarity_mode}'. Use one of: {', '.join(SIMILARITY_MODES)}")
+        return
+    top_k = int(os.environ.get('RECOMMENDER_TOP_K', '50'))
+    
+    normalized_features = normalize_features(features)
+    similarity_matrix = None
+    neighbor_idx = neighbor_scores = None
+    
+    if similarity_mode == 'dense':
+        # Compute similarity matrix
+        print("\n📊 Computing destination similarity matrix...")
+        similarity_matrix = compute_similarity_matrix(features)
+        print(f"✅ Similarity matrix: {similarity_matrix.shape}")
+    elif similarity_mode == 'topk':
+        print(f"\n📊 Computing top-{top_k} neighbors per destination...")
+        neighbor_idx, neighbor_scores = compute_top_k_neighbors(normalized_features, top_k)
+        print(f"✅ Neighbor table: {neighbor_idx.shape}")
+    else:
+        print("\n📊 On-demand mode: similarities will be computed at request time")
+        # Only the rows needed for the sample output below
+        similarity_matrix = normalized_features[:3] @ normalized_features.T
     
     # Test: Get similar destinations for first few destinations
     print("\n" + "=" * 80)
@@ -250,7 +319,10 @@ async def main():
         dest_name = df.iloc[i]['name']
         dest_category = df.iloc[i]['category']
         
-        similar = get_top_similar_destinations(similarity_matrix, i, n_recommendations=3)
+        if similarity_matrix is not None:
+            similar = get_top_similar_destinations(similarity_matrix, i, n_recommendations=3)
+        else:
+            similar = list(zip(neighbor_idx[i, :3], neighbor_scores[i, :3]))
         
         print(f"\n📍 {dest_name} ({dest_category})")
         print(f"   Similar destinations:")
@@ -263,8 +335,15 @@ async def main():
     print("\n💾 Saving model components...")
     
     # Save artifacts
-    np.save(MODEL_DIR / "recommender_similarity_matrix.npy", similarity_matrix)
-    np.save(MODEL_DIR / "recommender_features.npy", features)
+    # Matrices are stored as float32 .npy so the service can memory-map them
+    if similarity_mode == 'dense':
+        np.save(MODEL_DIR / "recommender_similarity_matrix.npy", similarity_matrix.astype(np.float32))
+    else:
+        np.save(MODEL_DIR / "recommender_features_normalized.npy", normalized_features)
+    if similarity_mode == 'topk':
+        np.save(MODEL_DIR / "recommender_neighbors_idx.npy", neighbor_idx)
+        np.save(MODEL_DIR / "recommender_neighbors_scores.npy", neighbor_scores)
+    np.save(MODEL_DIR / "recommender_features.npy", features.astype(np.float32))
     joblib.dump(tfidf, MODEL_DIR / "recommender_tfidf.joblib")
     joblib.dump(scaler, MODEL_DIR / "recommender_scaler.joblib")
     
@@ -272,6 +351,8 @@ async def main():
     metadata = {
         'n_destinations': len(df),
         'feature_dim': features.shape[1],
+        'similarity_mode': similarity_mode,
+        'top_k': int(neighbor_idx.shape[1]) if similarity_mode == 'topk' else None,
         'categories': categories,
         'provinces': provinces,
         'destinations': df[['id', 'name', 'province', 'category', 'rating']].to_dict('records')
@@ -280,7 +361,12 @@ async def main():
     with open(MODEL_DIR / "recommender_metadata.json", 'w') as f:
         json.dump(metadata, f, indent=2)
     
-    print(f"   ✅ Similarity matrix: {MODEL_DIR / 'recommender_similarity_matrix.npy'}")
+    if similarity_mode == 'dense':
+        print(f"   ✅ Similarity matrix: {MODEL_DIR / 'recommender_similarity_matrix.npy'}")
+    else:
+        print(f"   ✅ Normalized features: {MODEL_DIR / 'recommender_features_normalized.npy'}")
+    if similarity_mode == 'topk':
+        print(f"   ✅ Neighbors: {MODEL_DIR / 'recommender_neighbors_idx.npy'}, {MODEL_DIR / 'recommender_neighbors_scores.npy'}")
     print(f"   ✅ Features: {MODEL_DIR / 'recommender_features.npy'}")
     print(f"   ✅ TF-IDF vectorizer: {MODEL_DIR / 'recommender_tfidf.joblib'}")
     print(f"   ✅ Scaler: {MODEL_DIR / 'recommender_scaler.joblib'}")